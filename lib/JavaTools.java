@@ -5,6 +5,41 @@ import java.lang.reflect.Method;
 import java.util.ArrayList;
 
 import java.util.List;
+import java.util.Map;
+import java.util.LinkedHashMap;
+import java.util.UUID;
+import java.util.Enumeration;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.atomic.AtomicInteger;
+import java.util.concurrent.atomic.AtomicLong;
+
+import java.io.BufferedReader;
+import java.io.ByteArrayOutputStream;
+import java.io.File;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.io.OutputStreamWriter;
+import java.io.PrintStream;
+import java.io.Writer;
+import java.lang.management.ManagementFactory;
+import java.net.InetAddress;
+import java.net.ServerSocket;
+import java.net.Socket;
+import java.net.SocketTimeoutException;
+import java.net.URI;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.DirectoryStream;
+import java.nio.file.FileSystem;
+import java.nio.file.FileSystems;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.StandardCopyOption;
+import java.util.zip.ZipEntry;
+import java.util.zip.ZipFile;
 
 import java.util.regex.Matcher;
 import java.util.regex.Pattern;
@@ -33,21 +68,176 @@ public class JavaTools {
         "javax.crypto"
     };
 
+    private static final String info = "<methods:className>, <class:className>, <classes:>, <find:className> or <checkstyle:config files...> commands are expected";
+
+    // caches that are kept warm while JavaTools runs in server mode
+    private static final Map<String, List<Class>>  shortNames = new ConcurrentHashMap<>();
+    private static final Map<String, JarEntries>   jars       = new ConcurrentHashMap<>();
+    private static final Map<String, Object[]>     checkers   = new ConcurrentHashMap<>();  // { config path: [ mtime, checker ] }
+
+    private static ClassLoader projectLoader = null;
+    private static String      projectStamp  = null;
+
+    // Loader of "lithium.classpath" project classes. Loaded classes cannot be re-loaded,
+    // so the loader is re-created when a classpath jar or a class file has been changed.
+    // The replaced loader is not closed, since a concurrent request can still use it.
+    // JavaTools class loader is used if "lithium.classpath" is not defined
+    public static synchronized ClassLoader projectClassLoader() throws Exception {
+        String classpath = System.getProperty("lithium.classpath");
+        if (classpath == null || classpath.length() == 0) {
+            return JavaTools.class.getClassLoader();
+        }
+
+        String stamp = classpathStamp(classpath);
+        if (projectLoader == null || !stamp.equals(projectStamp)) {
+            List<URL> urls = new ArrayList();
+            for (String item : classpath.split(File.pathSeparator)) {
+                if (item.length() > 0) {
+                    urls.add(new File(item).toURI().toURL());
+                }
+            }
+            projectLoader = new URLClassLoader(urls.toArray(new URL[urls.size()]), JavaTools.class.getClassLoader());
+            projectStamp  = stamp;
+        }
+        return projectLoader;
+    }
+
+    // state of classpath items: size and modification time of jars, number of class
+    // files and the latest class file modification time of folders
+    private static String classpathStamp(String classpath) throws Exception {
+        StringBuilder stamp = new StringBuilder();
+        for (String item : classpath.split(File.pathSeparator)) {
+            File path = new File(item);
+            if (path.isDirectory()) {
+                long[] state = new long[] { 0, 0 };
+                try (java.util.stream.Stream<Path> files = Files.walk(path.toPath())) {
+                    files.filter(p -> p.toString().endsWith(".class")).forEach(p -> {
+                        state[0]++;
+                        state[1] = Math.max(state[1], p.toFile().lastModified());
+                    });
+                }
+                stamp.append(item).append(':').append(state[0]).append(':').append(state[1]).append(';');
+            } else {
+                stamp.append(item).append(':').append(path.length()).append(':').append(path.lastModified()).append(';');
+            }
+        }
+        return stamp.toString();
+    }
+
     public static List<Class> classByShortName(String name) throws Exception {
-        List<Class> res = new ArrayList();
-        for (String pkg :  packages) {
-            try {
-                String fullClassName = String.format("%s.%s", pkg, name);
-                Class clz = Class.forName(fullClassName);
-                res.add(clz);
-            } catch (Exception e) {
+        List<Class> res = shortNames.get(name);
+        if (res == null) {
+            res = new ArrayList();
+            for (String pkg :  packages) {
+                try {
+                    String fullClassName = String.format("%s.%s", pkg, name);
+                    Class clz = Class.forName(fullClassName);
+                    res.add(clz);
+                } catch (Exception e) {
 
+                }
+            }
+            shortNames.put(name, res);
+        }
+        return res;
+    }
+
+    // list classes of the known packages: JRT file system is used for Java 9+ and rt.jar for Java 8
+    public static List<String> classesOfPackages() throws Exception {
+        List<String> res = new ArrayList();
+        try {
+            FileSystem fs = FileSystems.getFileSystem(URI.create("jrt:/"));
+            for (String pkg : packages) {
+                Path pkgPath = fs.getPath("/packages", pkg);
+                if (Files.exists(pkgPath)) {
+                    try (DirectoryStream<Path> modules = Files.newDirectoryStream(pkgPath)) {
+                        for (Path module : modules) {
+                            try (DirectoryStream<Path> classes = Files.newDirectoryStream(fs.getPath("/modules", module.getFileName().toString(), pkg.replace('.', '/')), "*.class")) {
+                                for (Path clazz : classes) {
+                                    addClassName(res, pkg.replace('.', '/') + "/" + clazz.getFileName().toString());
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        } catch (java.nio.file.ProviderNotFoundException | java.nio.file.FileSystemNotFoundException e) {
+            File rt = new File(System.getProperty("java.home"), "lib/rt.jar");
+            if (rt.exists()) {
+                for (String name : jarEntries(rt)) {
+                    int idx = name.lastIndexOf('/');
+                    if (idx > 0 && java.util.Arrays.asList(packages).contains(name.substring(0, idx).replace('/', '.'))) {
+                        addClassName(res, name);
+                    }
+                }
             }
         }
         return res;
     }
 
-    public static void printMethods(Class clazz) throws Exception {
+    private static void addClassName(List<String> res, String entry) {
+        if (entry.endsWith(".class") && entry.indexOf('$') < 0) {
+            res.add(entry.substring(0, entry.length() - ".class".length()).replace('/', '.'));
+        }
+    }
+
+    // entries of a jar are listed once and re-listed only if the jar has been modified
+    private static class JarEntries {
+        long         modified;
+        long         size;
+        List<String> names;
+    }
+
+    private static List<String> jarEntries(File jar) throws Exception {
+        String     key     = jar.getAbsolutePath();
+        JarEntries entries = jars.get(key);
+        if (entries == null || entries.modified != jar.lastModified() || entries.size != jar.length()) {
+            entries          = new JarEntries();
+            entries.modified = jar.lastModified();
+            entries.size     = jar.length();
+            entries.names    = new ArrayList();
+            try (ZipFile zip = new ZipFile(jar)) {
+                Enumeration<? extends ZipEntry> en = zip.entries();
+                while (en.hasMoreElements()) {
+                    entries.names.add(en.nextElement().getName());
+                }
+            }
+            jars.put(key, entries);
+        }
+        return entries.names;
+    }
+
+    // look the given "Name.class" item up in JDK packages and in "lithium.classpath" jars and folders
+    public static void findClass(String target, PrintStream out) throws Exception {
+        String name = target.endsWith(".class") ? target.substring(0, target.length() - ".class".length()) : target;
+        for (Class clazz : classByShortName(name)) {
+            out.println("[JAVA/rt.jar => " + clazz.getName() + "]");
+        }
+
+        String classpath = System.getProperty("lithium.classpath");
+        if (classpath == null || classpath.length() == 0) {
+            return;
+        }
+
+        for (String item : classpath.split(File.pathSeparator)) {
+            File path = new File(item);
+            if (path.isDirectory()) {
+                Path root = path.toPath();
+                try (java.util.stream.Stream<Path> files = Files.walk(root)) {
+                    files.filter(p -> p.getFileName() != null && p.getFileName().toString().equals(target))
+                         .forEach(p -> out.println("[" + item + " => " + root.relativize(p).toString().replace(File.separatorChar, '/') + "]"));
+                }
+            } else if (path.isFile() && (item.endsWith(".jar") || item.endsWith(".zip"))) {
+                for (String entry : jarEntries(path)) {
+                    if (entry.equals(target) || entry.endsWith("/" + target)) {
+                        out.println("[" + item + " => " + entry + "]");
+                    }
+                }
+            }
+        }
+    }
+
+    public static void printMethods(Class clazz, PrintStream out) throws Exception {
         String  pkg     = clazz.getPackage().getName() + ".";
         Pattern pattern = Pattern.compile(" ([^ ]+)(\\.[a-zA-Z_][a-zA-Z0-9_]*)\\(");
 
@@ -61,24 +251,78 @@ public class JavaTools {
                 methodString = methodString.substring(0, mt.start(1)) +
                                methodString.substring(mt.end(1) + 1);
             }
-            System.out.println("{" + methodString + "}");
+            out.println("{" + methodString + "}");
         }
     }
 
-    public static void main(String[] args) throws Exception {
-        String info = "<methods:className> or <class:className> commands are expected";
+    // Run checkstyle for the given files. Checkstyle is called with reflection, since
+    // its jar is in classpath only if it has been added to it. Configured checker is
+    // cached per config file and re-configured when the config is modified.
+    // Config name that is not a path is resolved relatively to "lithium.checkstyle.home".
+    // Output: number of errors checkstyle has detected
+    public static int checkStyle(String config, List<String> files, PrintStream out) throws Exception {
+        File configFile = new File(config);
+        if (!configFile.isAbsolute() && System.getProperty("lithium.checkstyle.home") != null) {
+            configFile = new File(System.getProperty("lithium.checkstyle.home"), config.endsWith(".xml") ? config : config + ".xml");
+        }
+
+        String   key     = configFile.getAbsolutePath();
+        Object[] checker = checkers.get(key);
+        if (checker == null || (Long) checker[0] != configFile.lastModified()) {
+            Class<?> resolverClass = Class.forName("com.puppycrawl.tools.checkstyle.PropertyResolver");
+            Object   expander      = Class.forName("com.puppycrawl.tools.checkstyle.PropertiesExpander")
+                                          .getConstructor(java.util.Properties.class)
+                                          .newInstance(System.getProperties());
+            Object   configuration = Class.forName("com.puppycrawl.tools.checkstyle.ConfigurationLoader")
+                                          .getMethod("loadConfiguration", String.class, resolverClass)
+                                          .invoke(null, key, expander);
+
+            Class<?> checkerClass  = Class.forName("com.puppycrawl.tools.checkstyle.Checker");
+            Object   instance      = checkerClass.getConstructor().newInstance();
+            checkerClass.getMethod("setModuleClassLoader", ClassLoader.class).invoke(instance, checkerClass.getClassLoader());
+            checkerClass.getMethod("configure", Class.forName("com.puppycrawl.tools.checkstyle.api.Configuration")).invoke(instance, configuration);
+            checker = new Object[] { configFile.lastModified(), instance };
+            checkers.put(key, checker);
+        }
+
+        Object instance = checker[1];
+        synchronized (instance) {
+            Class<?> checkerClass  = instance.getClass();
+            Class<?> listenerClass = Class.forName("com.puppycrawl.tools.checkstyle.api.AuditListener");
+            Class<?> optionsClass  = Class.forName("com.puppycrawl.tools.checkstyle.api.AutomaticBean$OutputStreamOptions");
+            Object   logger        = Class.forName("com.puppycrawl.tools.checkstyle.DefaultLogger")
+                                          .getConstructor(OutputStream.class, optionsClass)
+                                          .newInstance(out, optionsClass.getField("NONE").get(null));
+
+            List<File> paths = new ArrayList();
+            for (String file : files) {
+                paths.add(new File(file).getAbsoluteFile());
+            }
+
+            checkerClass.getMethod("addListener", listenerClass).invoke(instance, logger);
+            try {
+                return (Integer) checkerClass.getMethod("process", List.class).invoke(instance, paths);
+            } finally {
+                checkerClass.getMethod("removeListener", listenerClass).invoke(instance, logger);
+                out.flush();
+            }
+        }
+    }
 
+    // Execute the given command
+    // Output: exit code
+    public static int execute(String[] args, PrintStream out, PrintStream err) throws Exception {
         if (args.length == 0 || args[0].trim().length() == 0) {
-            System.err.println("No argument has been passed");
-            System.err.println(info);
-            System.exit(1);
+            err.println("No argument has been passed");
+            err.println(info);
+            return 1;
         }
 
         String command = args[0].trim();
-        if (!command.startsWith("methods:") && !command.startsWith("class:")) {
-            System.err.println("Unknown command");
-            System.err.println(info);
-            System.exit(1);
+        if (command.indexOf(':') < 0) {
+            err.println("Unknown command");
+            err.println(info);
+            return 1;
         }
 
         String prefix = command.substring(0, command.indexOf(':')).trim();
@@ -91,41 +335,325 @@ public class JavaTools {
             }
 
             for (Class clazz : classByShortName(suffix)) {
-                System.out.println("[JAVA/rt.jar => " + clazz.getName() + "]");
+                out.println("[JAVA/rt.jar => " + clazz.getName() + "]");
             }
+        } else if ("classes".equals(prefix)) {
+            for (String className : classesOfPackages()) {
+                out.println("[JAVA/rt.jar => " + className + "]");
+            }
+        } else if ("find".equals(prefix)) {
+            findClass(suffix.endsWith(".class") ? suffix : suffix + ".class", out);
+        } else if ("checkstyle".equals(prefix)) {
+            return checkStyle(suffix, java.util.Arrays.asList(args).subList(1, args.length), out);
         } else if ("methods".equals(prefix)) {
             Class clazz = null;
             try {
-                System.out.println("JavaTools.main(): Class.forName(" + suffix + ")");
-                clazz = Class.forName(suffix);
+                out.println("JavaTools.main(): Class.forName(" + suffix + ")");
+                clazz = Class.forName(suffix, false, projectClassLoader());
             } catch (ClassNotFoundException e) {
 
                 if (args.length > 1 && suffix.indexOf('.') <= 0) {
                     String pkg_name = args[1].trim();
-                    System.out.println("JavaTools.main(): Class.forName(" + pkg_name + "." + suffix + ")");
+                    out.println("JavaTools.main(): Class.forName(" + pkg_name + "." + suffix + ")");
                     try {
-                        clazz = Class.forName(pkg_name + "." + suffix);
+                        clazz = Class.forName(pkg_name + "." + suffix, false, projectClassLoader());
                     } catch (ClassNotFoundException ee) { }
                 }
 
                 if (clazz == null) {
-                    System.out.println("JavaTools.main(): classByShortName(" + suffix + ")");
+                    out.println("JavaTools.main(): classByShortName(" + suffix + ")");
                     List<Class> classes = classByShortName(suffix);
-                    System.out.println(classes);
+                    out.println(classes);
                     if (classes.size() == 1) {
                         clazz = classes.get(0);
                     } else {
-                        System.err.println("Class '" + suffix + "' cannot be found");
-                        System.exit(1);
+                        err.println("Class '" + suffix + "' cannot be found");
+                        return 1;
                     }
                 }
             }
 
-            printMethods(clazz);
+            printMethods(clazz, out);
         } else {
-            System.err.println("Unknown command");
-            System.err.println(info);
-            System.exit(1);
+            err.println("Unknown command");
+            err.println(info);
+            return 1;
+        }
+        return 0;
+    }
+
+    // Server mode keeps the JVM with loaded classes, listed jars and configured
+    // checkstyle checkers alive and serves commands over a loopback socket. Project
+    // classes are loaded from "lithium.classpath" with a loader that is re-created
+    // when the project classpath content has been changed (see projectClassLoader). Every
+    // request is one JSON line:
+    //    { "token": "...", "command": "methods:String", "args": [ "java.lang" ] }
+    // and gets one JSON line response:
+    //    { "code": 0, "lines": [ ... ] }
+    // Port and access token are written to the given state file, the file is
+    // removed when the server is stopped ("stop:" command) or has been idle
+    // for the given number of seconds.
+    public static void serve(String statePath, long idle) throws Exception {
+        final String       token   = UUID.randomUUID().toString();
+        final ServerSocket server  = new ServerSocket(0, 50, InetAddress.getLoopbackAddress());
+        final File         state   = new File(statePath);
+        final AtomicLong   access  = new AtomicLong(System.currentTimeMillis());
+        final AtomicInteger active = new AtomicInteger(0);
+        final boolean[]    stopped = new boolean[] { false };
+
+        server.setSoTimeout(1000);
+        state.getParentFile().mkdirs();
+
+        Map<String, Object> info = new LinkedHashMap();
+        info.put("port",      server.getLocalPort());
+        info.put("token",     token);
+        info.put("pid",       ManagementFactory.getRuntimeMXBean().getName().split("@")[0]);
+        info.put("classpath", System.getProperty("java.class.path"));
+        File tmp = new File(statePath + ".tmp");
+        Files.write(tmp.toPath(), toJson(info).getBytes(StandardCharsets.UTF_8));
+        Files.move(tmp.toPath(), state.toPath(), StandardCopyOption.REPLACE_EXISTING, StandardCopyOption.ATOMIC_MOVE);
+
+        Runtime.getRuntime().addShutdownHook(new Thread(() -> state.delete()));
+
+        ExecutorService pool = Executors.newCachedThreadPool(r -> {
+            Thread thread = new Thread(r);
+            thread.setDaemon(true);
+            return thread;
+        });
+
+        while (!stopped[0]) {
+            Socket socket;
+            try {
+                socket = server.accept();
+            } catch (SocketTimeoutException e) {
+                if (active.get() == 0 && System.currentTimeMillis() - access.get() > idle * 1000) {
+                    break;
+                }
+                continue;
+            }
+
+            active.incrementAndGet();
+            access.set(System.currentTimeMillis());
+            pool.submit(() -> {
+                try (Socket client = socket) {
+                    BufferedReader reader = new BufferedReader(new InputStreamReader(client.getInputStream(), StandardCharsets.UTF_8));
+                    Writer         writer = new OutputStreamWriter(client.getOutputStream(), StandardCharsets.UTF_8);
+                    String         line;
+                    while ((line = reader.readLine()) != null) {
+                        if (line.trim().length() == 0) {
+                            continue;
+                        }
+                        writer.write(handle(line, token, stopped));
+                        writer.write('\n');
+                        writer.flush();
+                        access.set(System.currentTimeMillis());
+                    }
+                } catch (Exception e) {
+                    System.err.println("JavaTools.serve(): " + e);
+                } finally {
+                    active.decrementAndGet();
+                }
+                return null;
+            });
+        }
+
+        server.close();
+        state.delete();
+        System.exit(0);
+    }
+
+    // Output: JSON response of the given JSON request
+    private static String handle(String line, String token, boolean[] stopped) {
+        Map<String, Object> response = new LinkedHashMap();
+        ByteArrayOutputStream buffer = new ByteArrayOutputStream();
+        try {
+            Map<String, Object> request = (Map<String, Object>) new JsonParser(line).parse();
+            if (!token.equals(request.get("token"))) {
+                throw new SecurityException("Invalid token");
+            }
+
+            String command = String.valueOf(request.get("command"));
+            if ("stop:".equals(command)) {
+                stopped[0] = true;
+                response.put("code", 0);
+            } else {
+                List<String> args = new ArrayList();
+                args.add(command);
+                if (request.get("args") instanceof List) {
+                    for (Object arg : (List) request.get("args")) {
+                        args.add(String.valueOf(arg));
+                    }
+                }
+
+                PrintStream out = new PrintStream(buffer, true, "UTF-8");
+                response.put("code", execute(args.toArray(new String[args.size()]), out, out));
+                out.flush();
+            }
+        } catch (Throwable e) {
+            Throwable cause = e instanceof java.lang.reflect.InvocationTargetException ? e.getCause() : e;
+            response.put("code", 1);
+            response.put("error", String.valueOf(cause));
+        }
+
+        List<String> lines = new ArrayList();
+        for (String l : new String(buffer.toByteArray(), StandardCharsets.UTF_8).split("\r?\n")) {
+            if (l.length() > 0) {
+                lines.add(l);
+            }
+        }
+        response.put("lines", lines);
+        return toJson(response);
+    }
+
+    private static String toJson(Object value) {
+        StringBuilder sb = new StringBuilder();
+        if (value == null) {
+            sb.append("null");
+        } else if (value instanceof Number || value instanceof Boolean) {
+            sb.append(value);
+        } else if (value instanceof Map) {
+            sb.append('{');
+            for (Map.Entry<?, ?> e : ((Map<?, ?>) value).entrySet()) {
+                if (sb.length() > 1) {
+                    sb.append(',');
+                }
+                sb.append(toJson(String.valueOf(e.getKey()))).append(':').append(toJson(e.getValue()));
+            }
+            sb.append('}');
+        } else if (value instanceof List) {
+            sb.append('[');
+            for (Object item : (List) value) {
+                if (sb.length() > 1) {
+                    sb.append(',');
+                }
+                sb.append(toJson(item));
+            }
+            sb.append(']');
+        } else {
+            sb.append('"');
+            for (char c : value.toString().toCharArray()) {
+                if (c == '"' || c == '\\') {
+                    sb.append('\\').append(c);
+                } else if (c < 0x20) {
+                    sb.append(String.format("\\u%04x", (int) c));
+                } else {
+                    sb.append(c);
+                }
+            }
+            sb.append('"');
+        }
+        return sb.toString();
+    }
+
+    // Minimal JSON parser of server requests
+    private static class JsonParser {
+        private final String text;
+        private int          pos = 0;
+
+        JsonParser(String text) {
+            this.text = text;
+        }
+
+        Object parse() {
+            skip();
+            char c = text.charAt(pos);
+            if (c == '{') {
+                Map<String, Object> map = new LinkedHashMap();
+                pos++;
+                skip();
+                if (text.charAt(pos) == '}') {
+                    pos++;
+                    return map;
+                }
+                while (true) {
+                    skip();
+                    String key = (String) parse();
+                    skip();
+                    expect(':');
+                    map.put(key, parse());
+                    skip();
+                    if (text.charAt(pos) == ',') {
+                        pos++;
+                    } else {
+                        expect('}');
+                        return map;
+                    }
+                }
+            } else if (c == '[') {
+                List<Object> list = new ArrayList();
+                pos++;
+                skip();
+                if (text.charAt(pos) == ']') {
+                    pos++;
+                    return list;
+                }
+                while (true) {
+                    list.add(parse());
+                    skip();
+                    if (text.charAt(pos) == ',') {
+                        pos++;
+                    } else {
+                        expect(']');
+                        return list;
+                    }
+                }
+            } else if (c == '"') {
+                StringBuilder sb = new StringBuilder();
+                pos++;
+                while ((c = text.charAt(pos++)) != '"') {
+                    if (c == '\\') {
+                        c = text.charAt(pos++);
+                        switch (c) {
+                            case 'n': sb.append('\n'); break;
+                            case 'r': sb.append('\r'); break;
+                            case 't': sb.append('\t'); break;
+                            case 'b': sb.append('\b'); break;
+                            case 'f': sb.append('\f'); break;
+                            case 'u': sb.append((char) Integer.parseInt(text.substring(pos, pos + 4), 16)); pos += 4; break;
+                            default:  sb.append(c);
+                        }
+                    } else {
+                        sb.append(c);
+                    }
+                }
+                return sb.toString();
+            } else {
+                int start = pos;
+                while (pos < text.length() && ",}] \t".indexOf(text.charAt(pos)) < 0) {
+                    pos++;
+                }
+                String token = text.substring(start, pos);
+                if ("null".equals(token))  return null;
+                if ("true".equals(token))  return Boolean.TRUE;
+                if ("false".equals(token)) return Boolean.FALSE;
+                return Double.valueOf(token);
+            }
+        }
+
+        private void skip() {
+            while (pos < text.length() && Character.isWhitespace(text.charAt(pos))) {
+                pos++;
+            }
+        }
+
+        private void expect(char c) {
+            if (pos >= text.length() || text.charAt(pos) != c) {
+                throw new IllegalArgumentException("'" + c + "' is expected at " + pos);
+            }
+            pos++;
+        }
+    }
+
+    public static void main(String[] args) throws Exception {
+        // server:<state file> [idle seconds]
+        if (args.length > 0 && args[0].trim().startsWith("server:")) {
+            serve(args[0].trim().substring("server:".length()), args.length > 1 ? Long.parseLong(args[1].trim()) : 1800);
+            return;
+        }
+
+        int code = execute(args, System.out, System.err);
+        if (code != 0) {
+            System.exit(code);
         }
     }
 }
@@ -0,0 +1,465 @@
+import sublime, sublime_plugin
+
+import subprocess, threading, hashlib, time, sqlite3
+import os, platform, json, re
+import webbrowser
+import http.client
+from collections  import OrderedDict
+from urllib.parse import quote, urlsplit
+from html         import unescape
+
+from .settings import settings
+from .runner   import li_executor, li_project_home, li_show_message, li_private_folder
+
+# API documentation lookup: Dash, Solr doc server and local doc index
+
+# Pool of keep-alive HTTP connections to doc servers. A connection is
+# taken from the pool for a request and returned back when the response
+# has been completely read.
+class liHttpPool:
+    def __init__(self, max_idle = None, timeout = None):
+        self.max_idle = settings.get('doc_pool_size') if max_idle is None else max_idle
+        self.timeout  = settings.get('doc_timeout')   if timeout  is None else timeout
+        self.lock     = threading.Lock()
+        self.idle     = {}   # { (scheme, host, port): [ connection, ... ] }
+
+    def acquire(self, key):
+        with self.lock:
+            conns = self.idle.get(key)
+            if conns:
+                return conns.pop(), True
+
+        scheme, host, port = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout = self.timeout), False
+        return http.client.HTTPConnection(host, port, timeout = self.timeout), False
+
+    def release(self, key, conn):
+        with self.lock:
+            conns = self.idle.setdefault(key, [])
+            if len(conns) < self.max_idle:
+                conns.append(conn)
+                return
+        conn.close()
+
+    # Input: url - http(s) URL
+    # Output: response body bytes, exception is raised if the request has failed
+    def get(self, url):
+        parts = urlsplit(url)
+        key   = (parts.scheme, parts.hostname, parts.port)
+        path  = parts.path or '/'
+        if parts.query:
+            path = path + '?' + parts.query
+
+        while True:
+            conn, reused = self.acquire(key)
+            try:
+                conn.request('GET', path, headers = { 'Connection': 'keep-alive' })
+                response = conn.getresponse()
+                data     = response.read()
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                # idle connection could have been closed by server, repeat with new one
+                if reused:
+                    continue
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self.release(key, conn)
+
+            if response.status != 200:
+                raise http.client.HTTPException("HTTP %s %s" % (response.status, response.reason))
+            return data
+
+    def close(self):
+        with self.lock:
+            for conns in self.idle.values():
+                for conn in conns:
+                    conn.close()
+            self.idle = {}
+
+# Doc server lookups results cache. Recently used results are kept in a
+# bounded in-memory LRU, all results are stored in disk cache folder of the
+# user private folder and expire after "doc_cache_ttl" seconds. Results are
+# kept in memory only if there is no private folder.
+class liDocCache:
+    def __init__(self, folder = None, max_size = None, ttl = None):
+        self.folder   = folder
+        self.max_size = settings.get('doc_cache_size') if max_size is None else max_size
+        self.ttl      = settings.get('doc_cache_ttl')  if ttl      is None else ttl
+        self.lock     = threading.Lock()
+        self.cache    = OrderedDict()  # { key: [ time, value ] }
+
+    def key(self, syntax, word, url = ''):
+        return hashlib.sha1(("%s|%s|%s" % (syntax, word, url)).encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        if self.folder is None:
+            private = li_private_folder()
+            if private is None:
+                return None
+            self.folder = os.path.join(private, 'doc-cache')
+        return os.path.join(self.folder, key + '.json')
+
+    # Output: cached value or None if there is no actual value for the key
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            item = self.cache.get(key)
+            if item is not None:
+                if now - item[0] <= self.ttl:
+                    self.cache.move_to_end(key)
+                    return item[1]
+                del self.cache[key]
+
+        path = self.path(key)
+        if path is None:
+            return None
+
+        try:
+            if now - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path) as file:
+                item = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        self.remember(key, item[0], item[1])
+        return item[1]
+
+    def put(self, key, value):
+        now = time.time()
+        self.remember(key, now, value)
+        if self.path(key) is None:
+            return
+
+        try:
+            if not os.path.exists(self.folder):
+                os.makedirs(self.folder)
+            tmp = self.path(key) + '.' + str(threading.get_ident())
+            with open(tmp, 'w') as file:
+                json.dump([ now, value ], file)
+            os.replace(tmp, self.path(key))
+        except OSError as ex:
+            print("liDocCache.put(): result cannot be saved (%s)" % str(ex))
+
+    def remember(self, key, stamp, value):
+        with self.lock:
+            self.cache[key] = [ stamp, value ]
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last = False)
+
+li_doc_pool  = liHttpPool()
+
+li_doc_cache = liDocCache()
+
+# Look up api doc resources for the given word on Solr doc server.
+# The request is performed in background, results are cached
+# Input: callback(docs, error) - called in UI thread with list of found
+#        resources paths or error message
+def li_solr_lookup(syntax, word, callback, pool = None, cache = None):
+    pool  = li_doc_pool  if pool  is None else pool
+    cache = li_doc_cache if cache is None else cache
+    query = settings['doc_servers']['solr'][syntax]['url'].format(core = syntax, word = quote(word))
+    key   = cache.key(syntax, word, query)
+
+    docs = cache.get(key)
+    if docs is not None:
+        callback(docs, None)
+        return
+
+    def fetch():
+        try:
+            data = json.loads(pool.get(query).decode('utf-8'))
+            docs = [ doc['resourcename'][0] for doc in data['response']['docs'] ]
+            cache.put(key, docs)
+            sublime.set_timeout(lambda: callback(docs, None), 0)
+        except Exception as ex:
+            err = str(ex)
+            sublime.set_timeout(lambda: callback(None, err), 0)
+
+    li_executor.submit(fetch)
+
+# Local full-text index of HTML doc trees (generated javadoc, etc) stored
+# in project ".lithium/doc-index.db" SQLite FTS5 database. Index is updated
+# incrementally: only pages whose modification time has changed are parsed.
+class liDocIndex:
+    skip_pages = re.compile(r"(^|/)(index-all|index-files|allclasses[\w-]*|allpackages[\w-]*|overview-tree|package-tree|deprecated-list|help-doc|constant-values|serialized-form|search)(\.html?|/)")
+    title_re   = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+    script_re  = re.compile(r"<(script|style)[^>]*>.*?</\1>", re.I | re.S)
+    tag_re     = re.compile(r"<[^>]+>")
+    space_re   = re.compile(r"\s+")
+
+    def __init__(self):
+        self.lock     = threading.Lock()
+        self.conns    = {}    # { home: connection } lookup connections
+        self.indexing = set() # homes index is being built for
+
+    def db_path(self, home):
+        return os.path.join(home, '.lithium', 'doc-index.db')
+
+    def exists(self, home):
+        return os.path.exists(self.db_path(home))
+
+    def connect(self, home):
+        conn = sqlite3.connect(self.db_path(home), check_same_thread = False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime REAL)")
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(name, title, body, prefix='2 3', tokenize=\"unicode61 tokenchars '_$'\")")
+        return conn
+
+    def folders(self, home):
+        folders = []
+        for folder in settings.get('doc_index_folders'):
+            folder = os.path.join(home, folder)
+            if os.path.isdir(folder):
+                folders.append(os.path.realpath(folder))
+        return folders
+
+    # Output: [ name, title, body ] extracted from the given HTML page
+    def parse(self, path, root):
+        size = settings.get('doc_index_body_size')
+        with open(path, 'rb') as file:
+            text = file.read(size * 4).decode('utf-8', 'replace')
+
+        rel   = os.path.splitext(os.path.relpath(path, root))[0].replace(os.sep, '/')
+        name  = os.path.basename(rel)
+        title = self.title_re.search(text)
+        title = unescape(self.space_re.sub(' ', title.group(1))).strip() if title is not None else ''
+        body  = self.script_re.sub(' ', text)
+        body  = unescape(self.space_re.sub(' ', self.tag_re.sub(' ', body)))[:size]
+        # qualified name of javadoc class page ("java/util/List" -> "java.util.List")
+        return [ name, title + ' ' + rel.replace('/', '.'), body ]
+
+    # Crawl doc folders of the given project home and re-index changed pages
+    # Output: [ number of updated pages, number of removed pages ]
+    def update(self, home, folders = None):
+        folders = self.folders(home) if folders is None else folders
+        conn    = self.connect(home)
+        updated = 0
+        try:
+            known = {}
+            for (id, path, mtime) in conn.execute("SELECT id, path, mtime FROM files"):
+                known[path] = [ id, mtime ]
+
+            seen = set()
+            for root in folders:
+                for dirpath, dirnames, filenames in os.walk(root):
+                    for filename in filenames:
+                        if not filename.endswith(('.html', '.htm')):
+                            continue
+
+                        path = os.path.join(dirpath, filename)
+                        if self.skip_pages.search(os.path.relpath(path, root).replace(os.sep, '/')):
+                            continue
+
+                        seen.add(path)
+                        try:
+                            mtime = os.path.getmtime(path)
+                            item  = known.get(path)
+                            if item is not None and item[1] == mtime:
+                                continue
+
+                            doc = self.parse(path, root)
+                        except OSError as ex:
+                            print("liDocIndex.update(): '%s' cannot be indexed (%s)" % (path, str(ex)))
+                            continue
+
+                        if item is None:
+                            id = conn.execute("INSERT INTO files (path, mtime) VALUES (?, ?)", (path, mtime)).lastrowid
+                        else:
+                            id = item[0]
+                            conn.execute("UPDATE files SET mtime = ? WHERE id = ?", (mtime, id))
+                            conn.execute("DELETE FROM docs WHERE rowid = ?", (id,))
+                        conn.execute("INSERT INTO docs (rowid, name, title, body) VALUES (?, ?, ?, ?)", [ id ] + doc)
+
+                        updated += 1
+                        if updated % 500 == 0:
+                            conn.commit()
+
+            removed = [ item[0] for (path, item) in known.items() if path not in seen ]
+            for id in removed:
+                conn.execute("DELETE FROM files WHERE id = ?", (id,))
+                conn.execute("DELETE FROM docs WHERE rowid = ?", (id,))
+            conn.commit()
+            return [ updated, len(removed) ]
+        finally:
+            conn.close()
+
+    # Update index in background
+    # Input: callback(result, error) - called in UI thread with update() result or error message
+    def update_async(self, home, callback = None):
+        with self.lock:
+            if home in self.indexing:
+                return False
+            self.indexing.add(home)
+
+        def update():
+            result, error = None, None
+            try:
+                result = self.update(home)
+            except Exception as ex:
+                error = str(ex)
+            finally:
+                with self.lock:
+                    self.indexing.discard(home)
+
+            if callback is not None:
+                sublime.set_timeout(lambda: callback(result, error), 0)
+
+        li_executor.submit(update)
+        return True
+
+    # Prefix and ranked search of the given word. Pages whose name starts
+    # with the word are returned first, then pages the word is mentioned in
+    # Output: [ [ path, title ], ... ]
+    def lookup(self, home, word, limit = None):
+        limit = settings.get('doc_index_limit') if limit is None else limit
+        term  = '"%s"' % word.replace('"', '""')
+        with self.lock:
+            conn = self.conns.get(home)
+            if conn is None:
+                conn = self.connect(home)
+                self.conns[home] = conn
+
+            rows = conn.execute("SELECT files.path, docs.title FROM docs JOIN files ON files.id = docs.rowid "
+                                "WHERE docs MATCH ? ORDER BY docs.name != ? COLLATE NOCASE, bm25(docs, 10.0, 5.0, 1.0) LIMIT ?",
+                                ('name:%s*' % term, word, limit)).fetchall()
+            if len(rows) < limit:
+                found = set(row[0] for row in rows)
+                rows  = rows + [ row for row in conn.execute(
+                                "SELECT files.path, docs.title FROM docs JOIN files ON files.id = docs.rowid "
+                                "WHERE docs MATCH ? ORDER BY bm25(docs, 10.0, 5.0, 1.0) LIMIT ?",
+                                ('{title body}:%s' % term, limit)) if row[0] not in found ]
+            return [ list(row) for row in rows[:limit] ]
+
+li_doc_index = liDocIndex()
+
+# Pattern  InputStr.aeam
+class liShowDocCommand(sublime_plugin.TextCommand):
+    lookup_id = 0
+    def run(self, edit, **args):
+        file_name, extension = os.path.splitext(self.view.file_name())
+        word                 = None
+        syntax               = os.path.basename(self.view.settings().get('syntax'))
+        syntax               = os.path.splitext(syntax)[0]
+
+        for region in self.view.sel():
+            word = self.view.substr(self.view.word(region))
+            break
+
+        if word is not None and word != '':
+            type = args['type']
+            show_immediate = args['show_immediate'] if 'show_immediate' in args else False
+
+            if type == 'local':
+                self.open_local_doc(syntax, word, show_immediate)
+            elif type == 'solr':
+                self.open_solr_doc(syntax, word, show_immediate)
+            else:
+                self.open_dash_doc(syntax, word)
+
+    def open_link(self, link):
+        webbrowser.open(link)
+
+    def open_dash_doc(self, syntax, word):
+        dash_settings = settings.get('doc_servers')['dash']
+        keys_map      = settings.get('doc_servers')['dash']['keys_map']
+        keys          = keys_map[syntax] if syntax in keys_map else None
+        query         = dash_settings.get(syntax)['url'] if syntax in dash_settings else dash_settings['*']['url']
+        query         = query % (','.join(keys), quote(word))
+
+        if platform.system() == 'Windows':
+            subprocess.call(['start', query], shell=True)
+        elif platform.system() == 'Linux':
+            subprocess.call([ '/usr/bin/xdg-open', query ])
+        else:
+            print("liShowDocCommand(): Open dash %s" % query)
+            subprocess.call([ '/usr/bin/open', '-g', query ])
+
+    # look up the given word in project local doc index
+    def open_local_doc(self, syntax, word, show_immediate):
+        self.view.set_status('apidoc', '')
+        home = li_project_home()
+        if home is None:
+            self.view.set_status('apidoc', 'Lithium project home cannot be detected')
+        elif not li_doc_index.exists(home):
+            self.view.set_status('apidoc', 'Doc index is being built ...')
+            li_doc_index.update_async(home, lambda result, error: self.view.set_status('apidoc', 'Doc index is ready' if error is None else 'Doc index cannot be built'))
+        else:
+            docs = [ doc[0] for doc in li_doc_index.lookup(home, word) ]
+            if len(docs) == 0:
+                self.view.set_status('apidoc', "'%s' has not been found in doc index" % word)
+            else:
+                self.show_doc_links(syntax, word, docs, show_immediate)
+
+    # fetch list of available links to an api doc for the given word in background,
+    # popup is shown when the doc server responds
+    def open_solr_doc(self, syntax, word, show_immediate):
+        self.view.set_status('apidoc', '')
+
+        if syntax is not None and syntax in settings['doc_servers']['solr']:
+            liShowDocCommand.lookup_id += 1
+            lookup_id = liShowDocCommand.lookup_id
+            self.view.set_status('apidoc', "'%s' searching for '%s' ..." % (syntax, word))
+
+            def done(docs, error):
+                # skip results of lookups a newer one has been started after
+                if lookup_id != liShowDocCommand.lookup_id:
+                    return
+
+                self.view.set_status('apidoc', '')
+                if error is not None:
+                    sublime.error_message("Cannot find %s:'%s'(%s)" % (syntax, word, error))
+                else:
+                    self.show_doc_links(syntax, word, docs, show_immediate)
+
+            li_solr_lookup(syntax, word, done)
+        else:
+            self.view.set_status('apidoc', '%s search criteria is empty' % syntax)
+
+    def show_doc_links(self, syntax, word, docs, show_immediate):
+        result = []
+        for doc in docs:
+            path     = os.path.realpath(doc)
+            basename = os.path.basename(path)
+            dirname  = os.path.dirname(path)
+            title    = os.path.basename(dirname) + "/" + basename
+            result.append("<a style='display:block;' href='file://{path}'>{title}</a>".format(path = path, title = title))
+
+        if len(result) > 0:
+            self.view.set_status('apidoc', "'%s' search for '%s'" % (syntax, quote(word)))
+
+            if show_immediate == True:
+                self.open_link("file://" + os.path.realpath(docs[0]))
+            else:
+                content = "".join(result)
+                html    = settings['doc_servers']['solr']['html_template']
+                self.view.show_popup(
+                    html % (content,),
+                    sublime.HIDE_ON_MOUSE_MOVE_AWAY,
+                    max_width  = 400,
+                    max_height = 200,
+                    on_navigate = self.open_link)
+
+# Crawl project HTML doc trees ("doc_index_folders") into local doc index
+class liIndexDocsCommand(sublime_plugin.WindowCommand):
+    def run(self):
+        home = li_project_home()
+        if home is None:
+            li_show_message("Lithium project home cannot be detected")
+            return
+
+        started = time.time()
+        def done(result, error):
+            if error is not None:
+                sublime.error_message("Doc index cannot be updated (%s)" % error)
+            else:
+                sublime.status_message("Lithium: doc index has been updated, %d pages indexed, %d removed in %.1fs" % (result[0], result[1], time.time() - started))
+
+        if li_doc_index.update_async(home, done):
+            sublime.status_message("Lithium: doc index is being updated ...")
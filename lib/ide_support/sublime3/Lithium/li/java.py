@@ -0,0 +1,1232 @@
+import sublime, sublime_plugin
+
+import threading, time
+import concurrent.futures
+import os, json, re, glob, socket
+from itertools   import groupby
+from collections import OrderedDict, deque
+
+from .settings import settings, li_is_debug
+from .runner   import liTextCommand, li_executor, li_project_home, li_detect_host_folder, li_run, li_show_items, li_show_message
+from .output   import li_append_output_view, li_parse_output
+from .jobs     import li_bulk_partitions, li_files_command, li_mask_groups, li_command_chunks
+
+# JVM languages tooling: imports, classpath and project sources indexes,
+# class methods lookup
+
+# Simple class name to fully qualified class names index of project classpath.
+# The index file is maintained by lithium "IndexClasspath" artifact and is read
+# directly, the file is re-loaded only if it has been modified. The artifact
+# doesn't re-write the index if the classpath has not been changed.
+class liClasspathIndex:
+    def __init__(self):
+        self.lock      = threading.Lock()
+        self.indexes   = {}    # { home: [ mtime, { simple name: [ class name, ... ] } ] }
+        self.updating  = set() # homes the index is being updated for
+        self.refreshed = {}    # { home: time the index has been refreshed last time }
+
+    def index_path(self, home):
+        return os.path.join(home, '.lithium', 'classpath-index.json')
+
+    # Input: home - project home, word - simple class name
+    # Output: [ class name, ... ] or None if there is no index
+    def find(self, home, word):
+        names = self.load(home)
+        if names is None:
+            return None
+        return sorted(set(names.get(word, [])))
+
+    def load(self, home):
+        path = self.index_path(home)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        with self.lock:
+            cached = self.indexes.get(home)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+        names = {}
+        try:
+            with open(path) as file:
+                data = json.load(file)
+            for item in data['items'].values():
+                for class_name in item['classes']:
+                    names.setdefault(class_name[class_name.rfind('.') + 1:], []).append(class_name)
+        except (OSError, ValueError, KeyError) as ex:
+            print("liClasspathIndex.load(): classpath index '%s' cannot be read (%s)" % (path, str(ex)))
+            return None
+
+        with self.lock:
+            self.indexes[home] = [ mtime, names ]
+        return names
+
+    # The index file is re-written only if the classpath has been changed, so the
+    # fingerprint is built from the file stat, the index is not read
+    # Output: classpath state fingerprint or empty string if there is no index
+    def fingerprint(self, home):
+        try:
+            st = os.stat(self.index_path(home))
+        except OSError:
+            return ''
+        return "%i:%i" % (st.st_mtime_ns, st.st_size)
+
+    # refresh the index in background if it is missing or older than configured TTL
+    def refresh(self, home, force = False):
+        # unchanged index is not re-written, so the last refresh time is tracked too
+        try:
+            age = time.time() - max(os.path.getmtime(self.index_path(home)), self.refreshed.get(home, 0))
+        except OSError:
+            age = None
+
+        if force or age is None or age > settings.get('classpath_index_ttl'):
+            with self.lock:
+                if home in self.updating:
+                    return
+                self.updating.add(home)
+
+            def done(process, line):
+                if line is None:
+                    with self.lock:
+                        self.updating.discard(home)
+                        self.refreshed[home] = time.time()
+
+            def error(command, ex):
+                with self.lock:
+                    self.updating.discard(home)
+
+            li_run("IndexClasspath:\"%s\"" % home, done, error, True, { 'std': 'none', 'basedir': home }, False)
+
+li_classpath_index = liClasspathIndex()
+
+# Client of warm JavaTools JVM server the lithium "JavaToolsServer" artifact
+# runs per project classpath. The server writes its port and access token to
+# "<home>/.lithium/javatools/<classpath hash>.json" and serves one JSON line
+# request with one JSON line response:
+#    { "token": "...", "command": "methods:String", "args": [ "java.lang" ] }
+#    { "code": 0, "lines": [ ... ] }
+# Requests are served by an already running server only, the server is started
+# with "li_start_java_tools" command, None is returned if there is no server.
+class liJavaTools:
+    def __init__(self):
+        self.lock   = threading.Lock()
+        self.starts = {} # { home: start time }
+
+    # Output: [ state, ... ] of servers started for the given home, the most recent first
+    def servers(self, home):
+        paths = glob.glob(os.path.join(home, '.lithium', 'javatools', '*.json'))
+        states = []
+        for path in sorted(paths, key = lambda p: os.path.getmtime(p) if os.path.exists(p) else 0, reverse = True):
+            try:
+                with open(path) as file:
+                    state = json.load(file)
+                state['path'] = path
+                states.append(state)
+            except (OSError, ValueError):
+                pass
+        return states
+
+    # Input: home - project home, command - JavaTools command, args - command arguments
+    # Output: [ code, [ line, ... ] ] or None if there is no running server
+    def request(self, home, command, args = []):
+        if not settings.get('javatools_server') or home is None:
+            return None
+
+        for state in self.servers(home):
+            try:
+                with socket.create_connection(('127.0.0.1', state['port']), timeout = settings.get('run_timeout')) as sock:
+                    request = { 'token': state['token'], 'command': command, 'args': args }
+                    sock.sendall((json.dumps(request) + "\n").encode('utf-8'))
+                    line = sock.makefile('r', encoding = 'utf-8').readline()
+                    if len(line) == 0:
+                        continue
+
+                    res   = json.loads(line)
+                    lines = res.get('lines', [])
+                    if 'error' in res:
+                        lines.append(res['error'])
+
+                    if li_is_debug():
+                        print("liJavaTools.request(): '%s' %s served by '%s', code = %s" % (command, str(args), state['path'], res['code']))
+
+                    return [ res['code'], lines ]
+            except ConnectionRefusedError:
+                # server has been killed without cleaning its state up
+                try:
+                    os.remove(state['path'])
+                except OSError:
+                    pass
+            except (OSError, ValueError, KeyError) as ex:
+                print("liJavaTools.request(): '%s' request has failed (%s)" % (command, str(ex)))
+        return None
+
+    # Start server for the given home in background, a server is not started
+    # again while the previous start is in progress or the server is running
+    # Output: True if the server is being started
+    def start(self, home):
+        with self.lock:
+            started = self.starts.get(home)
+            if started is not None and time.time() - started < settings.get('run_timeout'):
+                return False
+            self.starts[home] = time.time()
+
+        for state in self.servers(home):
+            try:
+                socket.create_connection(('127.0.0.1', state['port']), timeout = settings.get('run_timeout')).close()
+                return False
+            except (OSError, KeyError):
+                pass
+
+        if li_is_debug():
+            print("liJavaTools.start(): start JavaTools server for '%s'" % home)
+
+        def error(command, ex):
+            print("liJavaTools.start(): '%s' has failed (%s)" % (command, str(ex)))
+
+        li_run("JavaToolsServer:\"%s\" %s" % (home, settings.get('javatools_server_idle')), lambda process, line: None, error, True, { 'std': 'none', 'basedir': home }, False)
+        return True
+
+li_java_tools = liJavaTools()
+
+# Scan header (package and imports declarations) of JVM languages source
+# code. Only a bounded prefix of the view is read, the prefix is extended
+# if the header doesn't fit it.
+# Output: { 'package': String or None, 'imports': [ [ region, "import <package>"], ... ] or None }
+def java_scan_header(view):
+    import_re  = re.compile(r"^import\s+(static\s+)?([^ :;\-]+)\s*")
+    package_re = re.compile(r"^package\s+([a-zA-Z0-9_.`]+)")
+    size       = view.size()
+    limit      = settings.get('header_scan_size')
+
+    while True:
+        text       = view.substr(sublime.Region(0, min(limit, size)))
+        imports    = []
+        package    = None
+        in_comment = False
+        completed  = False
+        offset     = 0
+        lines      = text.split("\n")
+
+        # the last line can be cut if the prefix is shorter than the view
+        if len(text) < size:
+            lines.pop()
+
+        for line in lines:
+            line_region = sublime.Region(offset, offset + len(line))
+            offset      = offset + len(line) + 1
+
+            code, in_comment = java_strip_comments(line, in_comment)
+            code = code.strip()
+            if len(code) == 0 or code.startswith("@"):  # skip empty lines, comments and annotations
+                continue
+
+            mt = import_re.match(code)
+            if mt is not None:
+                if mt.group(1) is not None:
+                    imports.append([ line_region, "import static %s" % mt.group(2) ])
+                else:
+                    imports.append([ line_region, "import %s" % mt.group(2) ])
+            else:
+                mt = package_re.match(code)
+                if mt is None:
+                    completed = True
+                    break
+                package = mt.group(1).strip('`')
+
+        if completed or len(text) >= size:
+            return { 'package': package, 'imports': imports if len(imports) > 0 else None }
+        limit = limit * 2
+
+# Remove comments from the given line
+# Input: line, in_comment - flag that indicates the line starts inside block comment
+# Output: [ line without comments, in_comment ]
+def java_strip_comments(line, in_comment):
+    if not in_comment and line.find("/") < 0:
+        return [ line, False ]
+
+    res = ""
+    i   = 0
+    while i < len(line):
+        if in_comment:
+            j = line.find("*/", i)
+            if j < 0:
+                return [ res, True ]
+            i, in_comment = j + 2, False
+        else:
+            j = line.find("/*", i)
+            k = line.find("//", i)
+            if k >= 0 and (j < 0 or k < j):
+                return [ res + line[i:k], False ]
+            if j < 0:
+                return [ res + line[i:], False ]
+            res, i, in_comment = res + line[i:j], j + 2, True
+    return [ res, in_comment ]
+
+li_headers = {} # { view id: [ change count, header ] }
+
+# Memoized source code header, re-scanned only if the view has been changed
+def java_collect_header(view):
+    vid    = view.id()
+    cc     = view.change_count()
+    cached = li_headers.get(vid)
+    if cached is None or cached[0] != cc:
+        cached = [ cc, java_scan_header(view) ]
+        li_headers[vid] = cached
+    return cached[1]
+
+# return string
+def java_package(view):
+    regs = view.find_by_selector('source.java meta.package-declaration.java meta.path.java entity.name.namespace.java')
+    if regs is not None and len(regs) > 0:
+        return view.substr(regs[0])
+    return java_collect_header(view)['package']
+
+# Collect imports
+# Output: [ [ region, "import <package>"], ... ]
+def java_collect_imports(view, syntax = 'java'):
+    return java_collect_header(view)['imports']
+
+# Convert checkstyle detected locations to unused imports
+# Input: [ [ file, line, message ], ... ]
+# output: [ [ String:import, int:line ] ]
+def java_unused_imports_from_paths(paths):
+    re_unused_import = r"\s+([^;:,?!!%^&()|+=></-]+)\s+\[UnusedImports\]$"
+    res = []
+    for path in paths:
+        match = re.search(re_unused_import, path[2])
+        if match is not None:
+           res.append([ match.group(1), int(path[1]) ])
+
+    if li_is_debug():
+        print("java_unused_imports_from_paths(): detected unused imports %s" % str(res))
+
+    return res
+
+# Detect unused imports with checkstyle the warm JavaTools server keeps configured
+# Output: [ [ file, line, message ], ... ] or None if the server is not running
+def java_detect_unused_imports_served(view):
+    fn   = view.file_name()
+    home = li_detect_host_folder(fn) if fn is not None else None
+    res  = li_java_tools.request(os.path.realpath(home) if home is not None else None, "checkstyle:unused", [ fn ])
+    if res is None:
+        return None
+
+    return java_checkstyle_locations(res[1])
+
+# Parse checkstyle output lines "[LEVEL] file:line:column: message"
+# Output: [ (file, line, message), ... ]
+def java_checkstyle_locations(lines):
+    paths = []
+    for line in lines:
+        mt = re.match(r"^\[\w+\]\s+(.+?):(\d+):(?:\d+:)?\s*(.*)$", line)
+        if mt is not None:
+            paths.append((mt.group(1), mt.group(2), mt.group(3)))
+    return paths
+
+# Detect unused imports with checkstyle asynchronously
+# Input: view, callback(imports) - called with [ [ String:import, int:line ] ] or None if detection has failed
+def java_detect_unused_imports_async(view, callback):
+    paths = []
+    def collect(process, line):
+        if line is not None:
+            paths.extend(li_parse_output(line))
+        else:
+            callback(java_unused_imports_from_paths(paths))
+
+    def error(command, ex):
+        print("java_detect_unused_imports_async(): '%s' has failed (%s)" % (command, str(ex)))
+        callback(None)
+
+    def detect():
+        served = java_detect_unused_imports_served(view)
+        if served is not None:
+            callback(java_unused_imports_from_paths(served))
+        else:
+            try:
+                li_run("UnusedJavaCheckStyle:\"%s\" " % view.file_name(), collect, error, True, None, False)
+            except Exception as ex:
+                error("UnusedJavaCheckStyle", ex)
+
+    li_executor.submit(detect)
+
+# Detect unused imports analyzing identifiers the view text refers after imports block.
+# Wildcard, Kotlin / Scala aliases and selectors imports cannot be resolved this way.
+# output: [ [ [ String:import, int:line ], ... ], Boolean:resolved ]
+def java_detect_unused_imports_fast(view):
+    imports = java_collect_imports(view)
+    if imports is None:
+        return [ [], True ]
+
+    body        = view.substr(sublime.Region(imports[-1][0].b, view.size()))
+    identifiers = set(re.findall(r"[A-Za-z_$][A-Za-z0-9_$]*", body))
+    resolved    = True
+    res         = []
+    for imp in imports:
+        name = imp[1].split(' ')[-1]
+        line = view.substr(imp[0])
+        if name.endswith('*') or name.endswith('._') or name.find('{') >= 0 or re.search(r"\sas\s|=>", line) is not None:
+            resolved = False
+        elif name[name.rfind('.') + 1:] not in identifiers:
+            res.append([ name, view.rowcol(imp[0].a)[0] + 1 ])
+
+    if li_is_debug():
+        print("java_detect_unused_imports_fast(): detected unused imports %s, resolved = %s" % (str(res), resolved))
+
+    return [ res, resolved ]
+
+# Resolve class name by imports and package of the given view
+# Output: [ symbol, package name or None ]
+def java_resolve_class(view, symbol):
+    imports = java_collect_imports(view)
+    if imports is not None:
+        detected_package = [ x[1] for x in imports if x[1].endswith("." + symbol)]
+        if len(detected_package) > 0:
+            symbol = detected_package[0].split(' ')[-1]
+
+    pkg_name = java_package(view)
+    if symbol.find('.') > 0:
+        pkg_name = None
+    return [ symbol, pkg_name ]
+
+# Fetch class methods signatures with lithium
+# Output: [ method signature, ... ]
+def java_fetch_methods(symbol, pkg_name = None, home = None, show_panel = True):
+    # warm JavaTools server is used if it is running
+    res = li_java_tools.request(home if home is not None else li_project_home(), "methods:%s" % symbol, [] if pkg_name is None else [ pkg_name ])
+    if res is not None:
+        return [ mt.group(1).strip() for mt in ( re.search(r'\{([^\{\}]+)\}', line) for line in res[1] ) if mt is not None ]
+
+    options = { "std": "none" }
+    if home is not None:
+        options['basedir'] = home
+
+    if pkg_name is None:
+        handle = li_run("ShowClassMethods:%s" % symbol, None, None, True, options, show_panel)
+    else:
+        handle = li_run("ShowClassMethods:%s %s" % (symbol, pkg_name), None, None, True, options, show_panel)
+
+    methods = []
+    try:
+        for line in handle.lines(settings.get('run_timeout')):
+            mt = re.search(r'\{([^\{\}]+)\}', line)
+            if mt is not None:
+                method   = mt.group(1).strip()
+                th_index = method.find(' throws ')
+                # if th_index > 0:
+                #     methods.append(method[0:th_index] + "\n" + method[th_index:])
+                # else:
+                methods.append( method )
+    except Exception as ex:
+        print("java_fetch_methods(): unexpected error (%s)" % str(ex))
+
+    return methods
+
+# Bounded LRU cache of class methods signatures keyed by class name and
+# classpath fingerprint. The cache is persisted in project ".lithium" folder
+# and can be filled in background for classes a view imports.
+class liMethodsCache:
+    def __init__(self, max_size = None):
+        self.max_size = settings.get('methods_cache_size') if max_size is None else max_size
+        self.lock     = threading.Lock()
+        self.caches   = {}      # { home: OrderedDict({ key: [ method, ... ] }) }
+        self.dirty    = set()   # homes whose cache has to be saved
+        self.pending  = deque() # [ [ home, symbol, package ], ... ] classes to be prefetched
+        self.failed   = set()   # keys of classes methods cannot be fetched for in background
+        self.worker   = None
+
+    def cache_path(self, home):
+        return os.path.join(home, '.lithium', 'methods-cache.json')
+
+    def key(self, home, symbol, pkg_name):
+        return "%s|%s|%s" % (symbol, pkg_name or '', li_classpath_index.fingerprint(home))
+
+    # call with lock acquired
+    def cache(self, home):
+        cache = self.caches.get(home)
+        if cache is None:
+            cache = OrderedDict()
+            try:
+                with open(self.cache_path(home)) as file:
+                    for item in json.load(file):
+                        cache[item[0]] = item[1]
+            except (OSError, ValueError, IndexError):
+                pass
+            self.caches[home] = cache
+        return cache
+
+    # Output: [ method, ... ] or None if the class methods have not been cached
+    def get(self, home, symbol, pkg_name = None):
+        key = self.key(home, symbol, pkg_name)
+        with self.lock:
+            cache   = self.cache(home)
+            methods = cache.get(key)
+            if methods is not None:
+                cache.move_to_end(key)
+            return methods
+
+    def put(self, home, symbol, pkg_name, methods):
+        key = self.key(home, symbol, pkg_name)
+        with self.lock:
+            cache      = self.cache(home)
+            cache[key] = methods
+            cache.move_to_end(key)
+            while len(cache) > self.max_size:
+                cache.popitem(last = False)
+
+            if home not in self.dirty:
+                self.dirty.add(home)
+                sublime.set_timeout_async(lambda: self.save(home), 1000)
+
+    def save(self, home):
+        with self.lock:
+            self.dirty.discard(home)
+            items = [ [ k, v ] for (k, v) in self.cache(home).items() ]
+
+        try:
+            with open(self.cache_path(home), 'w') as file:
+                json.dump(items, file)
+        except OSError as ex:
+            print("liMethodsCache.save(): cache cannot be saved (%s)" % str(ex))
+
+    # Fetch methods of classes imported by the given view in background
+    def prefetch(self, view, home):
+        imports = java_collect_imports(view)
+        if imports is None:
+            return
+
+        with self.lock:
+            for imp in imports:
+                name = imp[1].split(' ')[-1]
+                if not imp[1].startswith('import static') and not name.endswith('*'):
+                    self.pending.append([ home, name, None ])
+
+            if self.worker is None:
+                self.worker = threading.Thread(target = self.fetch_pending)
+                self.worker.start()
+
+    def fetch_pending(self):
+        while True:
+            with self.lock:
+                if len(self.pending) == 0:
+                    self.worker = None
+                    return
+                home, symbol, pkg_name = self.pending.popleft()
+
+            try:
+                key = self.key(home, symbol, pkg_name)
+                if key not in self.failed and self.get(home, symbol, pkg_name) is None:
+                    methods = java_fetch_methods(symbol, pkg_name, home, False)
+                    if len(methods) > 0:
+                        self.put(home, symbol, pkg_name, methods)
+                    else:
+                        self.failed.add(key)
+            except Exception as ex:
+                print("liMethodsCache.fetch_pending(): '%s' methods cannot be fetched (%s)" % (symbol, str(ex)))
+
+li_methods_cache = liMethodsCache()
+
+# Extract package, types and methods declarations from JVM languages source code.
+# Nested types get outer type name prefix ("pkg.Outer.Inner")
+# Output: [ package or None, [ [ class name, [ method signature, ... ] ], ... ] ]
+def java_scan_declarations(text):
+    text    = re.sub(r"/\*.*?\*/|//[^\n]*|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])'", ' ', text, flags = re.S)
+    package = re.search(r"^\s*package\s+([\w.]+)", text, re.M)
+    package = package.group(1) if package is not None else None
+
+    types = []  # [ [ class name, [ method, ... ] ], ... ]
+    stack = []  # [ [ type, depth ], ... ] types whose body is open
+    depth = 0
+    for mt in li_declarations_re.finditer(text):
+        if mt.group('type') is not None:
+            outer = stack[-1][0][0] if len(stack) > 0 else package
+            name  = mt.group('type') if outer is None else outer + '.' + mt.group('type')
+            types.append([ name, [] ])
+            if mt.group('body') is not None:
+                depth = depth + 1
+                stack.append([ types[-1], depth ])
+        elif mt.group('method') is not None or mt.group('fun') is not None:
+            if len(stack) > 0 and stack[-1][1] == depth and mt.group('method') not in li_not_methods:
+                method = re.sub(r"\s+", ' ', mt.group(0).rstrip('{').strip())
+                stack[-1][0][1].append(re.sub(r"^(?:@[\w$.]+(?:\([^()]*\))?\s+)*", '', method))
+            if mt.group(0).endswith('{'):
+                depth = depth + 1
+        elif mt.group(0) == '{':
+            depth = depth + 1
+        else:
+            if len(stack) > 0 and stack[-1][1] == depth:
+                stack.pop()
+            depth = max(depth - 1, 0)
+    return [ package, types ]
+
+li_not_methods = set([ 'if', 'for', 'while', 'switch', 'catch', 'return', 'new', 'synchronized', 'throw', 'else' ])
+
+li_declarations_re = re.compile(
+    # type declaration, the body "{" is captured if it follows the declaration
+    r"(?<![\w$.])(?:class|interface|enum|record|object|trait)\s+(?P<type>[A-Za-z_$][\w$]*)" +
+    r"(?:(?:[^{};\n]|\n(?!\s*(?:fun|def|val|var|class|interface|object|trait|enum|data|sealed|private|public|protected|internal|override|@)\b))*(?P<body>\{))?" +
+    # Java and Groovy style method: modifiers, result type, name and parameters
+    r"|^[ \t]*(?:@[\w$.]+(?:\([^()]*\))?\s+)*(?:(?:public|protected|private|static|final|abstract|synchronized|native|default|strictfp)\s+)*(?:<[^<>]*(?:<[^<>]*>[^<>]*)*>\s+)?" +
+    r"[\w$.]+(?:<[^{};()]*>)?(?:\[\])*\s+(?P<method>[A-Za-z_$][\w$]*)\s*\([^(){};]*\)[^{};=]*[{;]?" +
+    # Kotlin and Scala functions
+    r"|^[ \t]*(?:@[\w$.]+(?:\([^()]*\))?\s+)*(?:(?:public|protected|private|internal|override|open|abstract|final|inline|suspend|operator|infix|tailrec|implicit|lazy)\s+)*" +
+    r"(?:fun|def)\s+(?:<[^<>]*>\s*)?(?:[\w$.]+\.)?(?P<fun>[A-Za-z_$][\w$]*)\s*(?:\[[^\]]*\])?(?:\([^(){}]*\))*(?:\s*:\s*[\w$.<>?, \[\]]+)?[^{};=\n]*\{?" +
+    r"|[{}]", re.M)
+
+# Persistent index of types and methods declared in project sources. Project
+# types are resolved with no compilation and JVM. The index is stored in
+# project ".lithium/source-index.json", it is updated by modification time
+# scan when the project is opened and incrementally when a source is saved.
+class liSourceIndex:
+    def __init__(self):
+        self.lock    = threading.Lock()
+        self.files   = {}    # { home: { path: [ mtime, package, [ [ class name, [ method, ... ] ], ... ] ] } }
+        self.names   = {}    # { home: { simple name: set(class name) } }
+        self.methods = {}    # { home: { class name: [ method, ... ] } }
+        self.dirty   = set() # homes whose index has to be saved
+        self.scanned = set() # homes the sources scan has been started for
+
+    def index_path(self, home):
+        return os.path.join(home, '.lithium', 'source-index.json')
+
+    # call with lock acquired
+    def load(self, home):
+        if home in self.files:
+            return self.files[home]
+
+        files = {}
+        try:
+            with open(self.index_path(home)) as file:
+                for path, item in json.load(file)['files'].items():
+                    files[os.path.join(home, path)] = item
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+        self.files[home], self.names[home], self.methods[home] = files, {}, {}
+        for item in files.values():
+            self.add_types(home, item[2])
+        return files
+
+    # call with lock acquired
+    def add_types(self, home, types):
+        for name, methods in types:
+            self.names[home].setdefault(name[name.rfind('.') + 1:], set()).add(name)
+            self.methods[home][name] = methods
+
+    # call with lock acquired
+    def remove_types(self, home, types):
+        for name, methods in types:
+            simple = name[name.rfind('.') + 1:]
+            names  = self.names[home].get(simple)
+            if names is not None:
+                names.discard(name)
+                if len(names) == 0:
+                    del self.names[home][simple]
+            self.methods[home].pop(name, None)
+
+    def update_file(self, home, path, mtime = None):
+        try:
+            if mtime is None:
+                mtime = os.path.getmtime(path)
+            with open(path, encoding = 'utf-8', errors = 'replace') as file:
+                package, types = java_scan_declarations(file.read())
+        except OSError:
+            self.remove_file(home, path)
+            return
+
+        with self.lock:
+            files = self.load(home)
+            old   = files.get(path)
+            if old is not None:
+                self.remove_types(home, old[2])
+            files[path] = [ mtime, package, types ]
+            self.add_types(home, types)
+            self.changed(home)
+
+    def remove_file(self, home, path):
+        with self.lock:
+            old = self.load(home).pop(path, None)
+            if old is not None:
+                self.remove_types(home, old[2])
+                self.changed(home)
+
+    # call with lock acquired
+    def changed(self, home):
+        if home not in self.dirty:
+            self.dirty.add(home)
+            sublime.set_timeout_async(lambda: self.save(home), 1000)
+
+    def save(self, home):
+        with self.lock:
+            self.dirty.discard(home)
+            files = { os.path.relpath(path, home): item for (path, item) in self.load(home).items() }
+
+        try:
+            tmp = self.index_path(home) + '.tmp'
+            with open(tmp, 'w') as file:
+                json.dump({ 'files': files }, file, separators = (',', ':'))
+            os.replace(tmp, self.index_path(home))
+        except OSError as ex:
+            print("liSourceIndex.save(): index cannot be saved (%s)" % str(ex))
+
+    # Re-index project sources whose modification time has changed
+    def scan(self, home):
+        extensions = tuple(settings.get('source_index_extensions'))
+        skip       = set(settings.get('source_index_skip'))
+        seen       = set()
+        with self.lock:
+            known = { path: item[0] for (path, item) in self.load(home).items() }
+
+        for dirpath, dirnames, filenames in os.walk(home):
+            dirnames[:] = [ d for d in dirnames if not d.startswith('.') and d not in skip ]
+            for filename in filenames:
+                if filename.endswith(extensions):
+                    path = os.path.join(dirpath, filename)
+                    seen.add(path)
+                    try:
+                        mtime = os.path.getmtime(path)
+                    except OSError:
+                        continue
+                    if known.get(path) != mtime:
+                        self.update_file(home, path, mtime)
+
+        for path in set(known.keys()) - seen:
+            self.remove_file(home, path)
+
+    # Scan the project sources in background once per session
+    def ensure(self, home):
+        with self.lock:
+            if home in self.scanned:
+                return
+            self.scanned.add(home)
+
+        def scan():
+            try:
+                self.scan(home)
+            except Exception as ex:
+                print("liSourceIndex.scan(): '%s' sources cannot be indexed (%s)" % (home, str(ex)))
+        li_executor.submit(scan)
+
+    # Input: home - project home, word - simple class name
+    # Output: [ class name, ... ] declared in project sources
+    def find(self, home, word):
+        with self.lock:
+            self.load(home)
+            return sorted(self.names[home].get(word, []))
+
+    # Input: symbol - simple or full class name, pkg_name - package the symbol is referred from
+    # Output: [ method, ... ] or None if the class is not declared in project sources
+    def class_methods(self, home, symbol, pkg_name = None):
+        with self.lock:
+            self.load(home)
+            methods = self.methods[home]
+            if symbol in methods:
+                return methods[symbol]
+            if pkg_name is not None and pkg_name + '.' + symbol in methods:
+                return methods[pkg_name + '.' + symbol]
+            names = self.names[home].get(symbol, [])
+            if len(names) == 1:
+                return methods[next(iter(names))]
+            return None
+
+li_source_index = liSourceIndex()
+
+# Collect class methods signatures, lithium is called in background if the
+# methods have not been cached
+# Input: callback(methods) - called in UI thread
+def java_collect_methods(view, symbol, callback):
+    symbol, pkg_name = java_resolve_class(view, symbol)
+    home = li_project_home()
+    if home is not None:
+        # project sources classes are resolved with no lithium call
+        methods = li_source_index.class_methods(home, symbol, pkg_name)
+        if methods is not None and len(methods) > 0:
+            callback(methods)
+            return
+
+        methods = li_methods_cache.get(home, symbol, pkg_name)
+        if methods is not None:
+            callback(methods)
+            return
+
+    def fetch():
+        methods = java_fetch_methods(symbol, pkg_name, home)
+        if home is not None and len(methods) > 0:
+            li_methods_cache.put(home, symbol, pkg_name, methods)
+        sublime.set_timeout(lambda: callback(methods), 0)
+
+    li_executor.submit(fetch)
+
+# input: [ [ Region, String ], ... ]
+# output:[ [ group ], [ group ] ]  where group: [ region, String ], [ region, String ] ..,
+def java_group_imports(imports): # return [ [], [], ... ] grouped by package prefix
+    # add "a." prefix to key to sort java package first
+    imports = sorted(imports, key = lambda x : 'a.' + x[1] if x[1].startswith('import java.') or x[1].startswith('import javax.') else x[1])
+    groups  = []
+    #for k, g in groupby(imports, lambda x : x[1][:x[1].rfind('.')] ):
+    for k, g in groupby(imports, lambda x : x[1][:x[1].find('.')] ):
+        groups.append(list(g))
+
+    return groups
+
+# Input: [ [ Region, String ], ... ]
+# Output: imports block text sorted and grouped by package prefix
+def java_sorted_imports(imports):
+    imports_str = ""
+    for index, group in enumerate(java_group_imports(imports)):
+        if index > 0:
+            imports_str = imports_str + "\n\n"
+
+        import_items = [ x[1] for x in group ]
+        imports_str = imports_str + ";\n".join(import_items) + ";"
+    return imports_str
+
+class  liJavaTextCommand(liTextCommand):
+    def enabled_syntaxes(self):
+        return ( 'kotlin', 'java', 'scala', 'groovy' )
+
+# the command kill comments in Java import sections
+class liSortImportsCommand(liJavaTextCommand):
+    def run(self, edit, **args):
+        #  [ [Region, String:<import [static]? [package];>], ... ]
+        imports = java_collect_imports(self.view)
+
+        if imports is not None:
+            imports_str = java_sorted_imports(imports)
+            if len(imports_str) > 0:
+                # more gentle clean, but it preserves empty lines between imports
+                # for import_item in reversed(imports):
+                #     new_reg = self.view.line(import_item[0])
+                #     new_reg.b = new_reg.b + 1
+                #     self.view.erase(edit, new_reg)
+
+                a = imports[0][0].a
+                b = self.view.line(imports[len(imports) - 1][0]).b
+                self.view.replace(edit, sublime.Region(a, b), imports_str)
+
+class liRemoveUnusedImportsCommand(liJavaTextCommand):
+    def run(self, edit, **args):
+        # [ [ String:imp, int:line ] ]
+        if 'imports' in args:
+            # unused imports have been detected asynchronously, apply them if the buffer is still the same
+            if args['change_count'] == self.view.change_count():
+                self.remove_imports(edit, args['imports'])
+            else:
+                li_append_output_view("(W) [SUB]  %s: Buffer has been modified, detected un-used imports are ignored\n" % self.__class__.__name__)
+        else:
+            li_append_output_view("(I) [SUB]  %s: Remove un-used imports\n" % self.__class__.__name__)
+
+            imports, resolved = java_detect_unused_imports_fast(self.view)
+            if resolved or self.syntax() != 'java':
+                self.remove_imports(edit, imports)
+            else:
+                view         = self.view
+                change_count = view.change_count()
+                def detected(imports):
+                    if imports is not None:
+                        sublime.set_timeout(lambda: view.run_command("li_remove_unused_imports", {
+                            'imports'     : imports,
+                            'change_count': change_count,
+                            'sort'        : args.get('sort', False)
+                        }), 0)
+
+                java_detect_unused_imports_async(view, detected)
+                return
+
+        if args.get('sort', False):
+            self.view.run_command("li_sort_imports")
+
+    def remove_imports(self, edit, imports):
+        if imports is None or len(imports) == 0:
+            li_append_output_view("(W) [SUB]  %s: Un-used imports have not been detected\n" % self.__class__.__name__)
+            return
+
+        for imp in sorted(imports, key = lambda x : x[1], reverse = True):
+            line = imp[1]
+            region = self.view.full_line((self.view.text_point(line - 1, 0)));
+            self.view.show(region)
+            self.view.erase(edit, region)
+            li_append_output_view("(W) [SUB]  %s: Remove unused import '%s' at line %i\n" % ( self.__class__.__name__, imp[0],line))
+
+class liValidateImportsCommand(liJavaTextCommand):
+    def run(self, edit, **args):
+        self.view.run_command("li_remove_unused_imports", { 'sort': True })
+
+# Read-only file text that mimics view methods source header scanning uses
+class liTextBuffer:
+    def __init__(self, text):
+        self.text = text
+
+    def size(self):
+        return len(self.text)
+
+    def substr(self, region):
+        return self.text[region.begin():region.end()]
+
+# Remove unused imports and sort imports of the given file text
+# Input: text, lines - numbers of unused imports lines
+# Output: new text
+def java_validate_imports_text(text, lines):
+    if len(lines) > 0:
+        text_lines = text.splitlines(True)
+        for line in sorted(set(lines), reverse = True):
+            # checkstyle can report a line of multi-line import, it is kept
+            if line <= len(text_lines) and text_lines[line - 1].lstrip().startswith('import '):
+                del text_lines[line - 1]
+        text = "".join(text_lines)
+
+    imports = java_scan_header(liTextBuffer(text))['imports']
+    if imports is not None:
+        imports_str = java_sorted_imports(imports)
+        if text.find("\r\n") >= 0:
+            imports_str = imports_str.replace("\n", "\r\n")
+        # the last import line separator is kept
+        end = imports[-1][0].b
+        if text[end - 1:end] == "\r":
+            end = end - 1
+        text = text[:imports[0][0].a] + imports_str + text[end:]
+    return text
+
+# Validate imports of Java sources of the given folders, files or file mask:
+# unused imports of all files are detected with one checkstyle pass per
+# project, then every file is cleaned up and sorted in a workers pool and
+# written only if it has been changed. Files that have unsaved changes are skipped.
+class liStartJavaToolsCommand(sublime_plugin.WindowCommand):
+    def run(self):
+        home = li_project_home()
+        if home is None:
+            li_show_message("Lithium project home cannot be detected")
+            return
+
+        home = os.path.realpath(home)
+        if li_java_tools.start(home):
+            sublime.status_message("Lithium: JavaTools server is being started for '%s'" % home)
+        else:
+            sublime.status_message("Lithium: JavaTools server is already running for '%s'" % home)
+
+class liBulkValidateImportsCommand(sublime_plugin.WindowCommand):
+    def run(self, paths = [], mask = None):
+        home = None
+        if len(paths) == 0:
+            home = li_project_home()
+            if home is None:
+                sublime.status_message("Lithium: project home cannot be detected")
+                return
+
+            if mask is None:
+                self.window.show_input_panel("Validate imports of files (mask):", "**/*.java", lambda mask: self.run([], mask), None, None)
+                return
+
+        dirty = set()
+        for view in self.window.views():
+            if view.is_dirty() and view.file_name() is not None:
+                dirty.add(os.path.realpath(view.file_name()))
+
+        sublime.status_message("Lithium: collecting files to validate imports")
+        li_executor.submit(self.collect, home, paths, mask, dirty)
+
+    # Collect Java files of the given paths or of the project home mask, big trees
+    # are walked in the executor thread
+    def collect(self, home, paths, mask, dirty):
+        if len(paths) == 0:
+            paths = [ p for p in glob.glob(os.path.join(home, mask), recursive = True) if os.path.isfile(p) ]
+
+        partitions = li_bulk_partitions(paths, [ '.java' ])
+        if len(partitions) == 0:
+            sublime.set_timeout(lambda: sublime.status_message("Lithium: there are no Java files to validate imports"), 0)
+            return
+
+        count = sum(len(files) for files in partitions.values())
+        sublime.set_timeout(lambda: sublime.status_message("Lithium: validating imports of %i files" % count), 0)
+        self.validate(partitions, dirty)
+
+    # Input: partitions - { (home, ext): [ path, ... ] }, dirty - paths of modified views
+    def validate(self, partitions, dirty):
+        started = time.time()
+        unused  = {} # { path: [ line, ... ] }
+        files   = []
+        errors  = []
+        for (home, ext), paths in partitions.items():
+            files.extend(paths)
+            locations, failures = self.detect(home, paths)
+            errors.extend(failures)
+            for path, line, message in locations:
+                if message.endswith('[UnusedImports]'):
+                    unused.setdefault(os.path.realpath(path), []).append(int(line))
+
+        def validate_file(path):
+            if path in dirty:
+                return None
+            with open(path, 'r', encoding = 'utf-8', newline = '') as file:
+                text = file.read()
+            validated = java_validate_imports_text(text, unused.get(path, []))
+            if validated == text:
+                return False
+            with open(path, 'w', encoding = 'utf-8', newline = '') as file:
+                file.write(validated)
+            return True
+
+        changed, skipped, failed = [], [], []
+        workers = settings.get('bulk_jobs') or os.cpu_count() or 1
+        with concurrent.futures.ThreadPoolExecutor(max_workers = workers) as pool:
+            for path, future in [ (path, pool.submit(validate_file, path)) for path in files ]:
+                try:
+                    res = future.result()
+                    if res is None:
+                        skipped.append(path)
+                    elif res:
+                        changed.append(path)
+                except (OSError, UnicodeError) as ex:
+                    print("liBulkValidateImportsCommand.validate(): '%s' cannot be validated (%s)" % (path, str(ex)))
+                    failed.append(path)
+
+        report = "%i of %i files have been changed in %.1fs" % (len(changed), len(files), time.time() - started)
+        if len(skipped) > 0:
+            report = report + ", %i modified files skipped" % len(skipped)
+        if len(failed) > 0:
+            report = report + ", %i files failed" % len(failed)
+        if len(errors) > 0:
+            report = report + ", %i checkstyle runs failed" % len(errors)
+
+        def show():
+            for error in errors:
+                li_append_output_view("(E) [SUB]  %s: %s\n" % (self.__class__.__name__, error))
+            for path in failed:
+                li_append_output_view("(E) [SUB]  %s: Imports of '%s' cannot be validated\n" % (self.__class__.__name__, path))
+            for path in changed:
+                li_append_output_view("(I) [SUB]  %s: Imports of '%s' have been updated\n" % (self.__class__.__name__, path))
+            li_append_output_view("(I) [SUB]  %s: %s\n" % (self.__class__.__name__, report))
+            if len(errors) > 0:
+                sublime.active_window().run_command("show_panel", { "panel": "output.lithium" })
+            sublime.status_message("Lithium: imports validation, %s" % report)
+
+        sublime.set_timeout(show, 0)
+
+    # Detect checkstyle locations of the given files of the project, warm JavaTools
+    # server is used if it is running, otherwise checkstyle is run for chunks of files
+    # whose masks fit the command line
+    # Output: [ (file, line, message), ... ], [ failure, ... ]
+    def detect(self, home, paths):
+        res = li_java_tools.request(home, "checkstyle:unused", paths)
+        if res is not None:
+            return java_checkstyle_locations(res[1]), []
+
+        locations, failures = [], []
+        def output(process, line):
+            if line is not None:
+                locations.extend(li_parse_output(line))
+
+        options = dict(settings.get("li_opts"))
+        options['basedir'] = home
+        for group in li_mask_groups(paths):
+            for chunk in li_command_chunks(group):
+                command = li_files_command("UnusedJavaCheckStyle", chunk)
+                try:
+                    code = li_run(command, output, None, False, options, False).future.result()
+                    if code != 0:
+                        failures.append("Checkstyle of %i files has failed with exit code %s" % (len(chunk), code))
+                except Exception as ex:
+                    failures.append("Checkstyle of %i files has failed (%s)" % (len(chunk), str(ex)))
+        return locations, failures
+
+class liCompleteImportCommand(liJavaTextCommand):
+    found_items = []
+    edit        = None
+    region      = None
+    word        = None
+
+    def run(self, edit, **args):
+        # the command is re-invoked with selected class name to get valid edit object
+        if 'insert' in args:
+            self.edit   = edit
+            self.region = sublime.Region(args['region'][0], args['region'][1])
+            self.inline = args.get('inline', False)
+            self.insert_import(args['insert'])
+            return
+
+        li_append_output_view("(I) [SUB]  %s: Completing JAVA import\n" % self.__class__.__name__)
+
+        regions = self.view.sel()
+        if regions is not None and len(regions) == 1:
+            word = None
+            for region in regions:
+                self.region = self.view.word(region) # get extended to the current word region
+                self.word = self.view.substr(self.region)
+
+            li_append_output_view("(I) [SUB]  %s: completing '%s' word\n" % (self.__class__.__name__,self.word))
+
+            if self.word is not None and len(self.word.strip()) > 1:
+                # detect home folder
+                li_home = li_project_home()
+
+                self.inline = False
+                if 'inline' in args:
+                    self.inline = args['inline']
+
+                self.auto_apply = False
+                if 'auto_apply' in args:
+                    self.auto_apply = args['auto_apply']
+
+                # if word is not None and word != '':
+                try:
+                    self.found_items = []
+
+                    classes = None
+                    if li_home is not None:
+                        # project sources classes are found instantly with no compilation
+                        classes = li_source_index.find(li_home, self.word)
+                        indexed = li_classpath_index.find(li_home, self.word)
+                        if indexed is not None:
+                            classes = sorted(set(classes + indexed))
+                        li_classpath_index.refresh(li_home)
+
+                    if classes is not None and len(classes) > 0:
+                        self.handle      = None
+                        self.found_items = classes
+                        self.show_found_items()
+                    else:
+                        # classes are looked up in background, found items are shown in UI thread
+                        self.handle = None
+                        li_executor.submit(self.find_classes, li_home, self.word)
+
+                except Exception as ex:
+                    self.handle = None
+                    sublime.error_message("Lithium command execution has failed('%s')" % ((ex),))
+
+    # warm JavaTools server is asked first, lithium command is run if the server is not running
+    def find_classes(self, li_home, word):
+        res = li_java_tools.request(li_home, "find:%s.class" % word)
+        if res is None:
+            try:
+                self.handle = li_run("FindClassInClasspath:\"%s\" %s.class" % (li_home, word), self.output, self.error, True, None, False)
+            except Exception as ex:
+                self.error("FindClassInClasspath", ex)
+        else:
+            for line in res[1]:
+                self.output(None, line)
+            self.output(None, None)
+
+    def output(self, process, line):
+        # None means end of LI process
+        if line is not None:
+            rx = r"\[(.*)\s*=>\s*(.*)\]"
+            m = re.search(rx, line)
+            if m is not None:
+                class_name = m.group(2)
+                class_name = class_name.replace('/', '.')
+                class_name = re.sub('\.class$', '', class_name)
+                self.found_items.append(class_name)
+        else:
+            sublime.set_timeout(self.show_found_items, 0)
+
+    def show_found_items(self):
+        l = len(self.found_items)
+        if l > 20:
+            sublime.message_dialog("To many variants (more than 20) have been found")
+        elif l > 0:
+            if l == 1 and self.auto_apply:
+                self.class_name_selected(0)
+            else:
+                self.found_items.sort(),
+                self.view.show_popup_menu(
+                    self.found_items,
+                    self.class_name_selected)
+        else:
+            li_append_output_view("(W) [SUB]  No class has been found for '%s' word" % self.word)
+            #sublime.message_dialog("Import '%s' is already declared" % item)
+
+    def class_name_selected(self, index):
+        if index >= 0:
+            self.view.run_command('li_complete_import', {
+                'insert' : self.found_items[index],
+                'inline' : self.inline,
+                'region' : [ self.region.a, self.region.b ]
+            })
+
+    def insert_import(self, item):
+        syntax  = self.syntax()
+        imports = java_collect_imports(self.view, syntax)
+        if imports is not None and next((x[1] for x in imports if x[1].endswith(item)), None) is not None:
+            li_append_output_view("(W) [SUB]  %s: Import '%s' is already declared\n" % (self.__class__.__name__,item))
+        else:
+            scopes = self.view.scope_name(self.region.begin()).strip().split(" ")
+
+            if li_is_debug():
+                print("liCompleteImportCommand.insert_import(): detected syntax '%s' " % syntax)
+
+            if self.inline:
+                self.view.replace(self.edit, self.region, item)
+            else:
+                if syntax == 'java':
+                    if imports is not None:
+                        self.view.insert(self.edit, imports[0][0].a, "import %s;\n" % item)
+                    elif len(scopes) == 2 and scopes.index('source.java') >= 0 and scopes.index('support.class.java') >= 0:
+                        self.view.replace(self.edit, self.region, 'import %s;' % item)
+                    else:
+                        self.view.replace(self.edit, self.region, item)
+                elif syntax == 'kotlin':
+                    if imports is not None:
+                        self.view.insert(self.edit, imports[0][0].a, "import %s\n" % item)
+                    elif len(scopes) == 1 and scopes.index('source.Kotlin') >= 0:
+                        self.view.replace(self.edit, self.region, 'import %s' % item)
+                    else:
+                        self.view.replace(self.edit, self.region, item)
+                elif syntax == 'scala':
+                    if imports is not None:
+                        self.view.insert(self.edit, imports[0][0].a, "import %s\n" % item)
+                    elif len(scopes) == 2 and scopes.index('source.scala') >= 0 and scopes.index('support.constant.scala') >= 0:
+                        self.view.replace(self.edit, self.region, 'import %s' % item)
+                    else:
+                        self.view.replace(self.edit, self.region, item)
+                elif syntax == 'groovy':
+                    if len(scopes) == 1 and scopes.index('source.groovy') >= 0:
+                        self.view.replace(self.edit, self.region, 'import %s' % item)
+                    elif imports is not None:
+                        self.view.insert(self.edit, imports[0][0].a, "import %s\n" % item)
+                    else:
+                        self.view.replace(self.edit, self.region, item)
+
+    def error(self, command, err):
+        sublime.error_message("Lithium class detection has failed: ('%s')" % (str(err), ))
+
+class liShowClassMethodsCommand(liJavaTextCommand):
+    detected_methods = []
+    selected_method  = None
+
+    def run(self, edit, **args):
+        if "paste" in args:
+            regions = self.view.sel()
+            if len(regions) > 0:
+                region = regions[0]
+                word   = self.view.substr(self.view.word(region))
+                mt     = re.search(r"([a-zA-Z_][a-zA-Z0-9_]*\s*\([^()]*\))", self.selected_method)
+                self.view.insert(edit, region.a, mt.group(1))
+            else:
+                li_show_message("No region has been detected to place ")
+        else:
+            word   = None
+            for region in self.view.sel():
+                word = self.view.substr(self.view.word(region))
+                break
+
+            if word is not None and word != '':
+                self.detected_methods = []
+                self.selected_method = None
+
+                def show(methods):
+                    self.detected_methods = methods
+                    if len(self.detected_methods) > 0:
+                        li_show_items(self.detected_methods, self.method_name_selected)
+                    else:
+                        li_show_message("No method has been discovered for %s" % word)
+
+                java_collect_methods(self.view, word, show)
+            else:
+                li_show_message("Nothing has been selected")
+
+    def method_name_selected(self, index):
+        if index >= 0:
+            self.selected_method = self.detected_methods[index]
+        else:
+            self.selected_method = None
@@ -0,0 +1,998 @@
+import sublime, sublime_plugin
+
+import threading, hashlib, time, sqlite3
+import concurrent.futures
+import os, json, re
+from collections import OrderedDict, deque
+
+from .settings import settings, li_is_debug
+from .runner   import liTrace, li_detect_host_folder, li_host_folders, li_project_home, li_run, li_trace_span, li_tracing, li_view_to_s
+from .output   import liLocationIndex, liOutputBuffer, li_init_output_view, li_new_log_path
+
+# Lithium jobs scheduling, detected problems and builds of saved and
+# sidebar selected files
+
+# Incremental reader of lithium "std-out-entities.json" file. LithiumStd
+# writes one JSON entity per line, so only lines appended since the
+# previous read are parsed.
+class liEntitiesReader:
+    def __init__(self, path):
+        self.path     = path
+        self.offset   = 0
+        self.rest     = b""
+        self.lock     = threading.Lock()
+        self.resolved = {}  # { entity file: real path } resolved entities files
+
+    # Output: [ entity, ... ] new entities
+    def read(self):
+        with self.lock:
+            entities = []
+            try:
+                with open(self.path, 'rb') as file:
+                    if os.fstat(file.fileno()).st_size < self.offset:
+                        self.offset, self.rest = 0, b"" # file has been re-created
+                    file.seek(self.offset)
+                    data = file.read()
+            except OSError:
+                return entities
+
+            self.offset = self.offset + len(data)
+            lines       = (self.rest + data).split(b"\n")
+            self.rest   = lines.pop()
+            for line in lines:
+                line = line.strip()
+                if line.startswith(b","):
+                    line = line[1:]
+
+                if len(line) > 0 and line != b"[" and line != b"]":
+                    try:
+                        entities.append(json.loads(line.decode('utf-8')))
+                    except ValueError as ex:
+                        if li_is_debug():
+                            print("liEntitiesReader.read(): cannot parse '%s' (%s)" % (line, str(ex)))
+            return entities
+
+# Convert lithium std entity to a problem
+# Input: entity, home - project home to resolve relative paths,
+#        resolved - { file: real path } files resolved for entities of the same batch
+# Output: [ path, line, level, message, artifact class, artifact class abbreviation ] or None
+def li_entity_to_problem(entity, home = None, resolved = None):
+    if 'file' not in entity:
+        return None
+
+    fp = entity['file']
+    if not os.path.isabs(fp) and home is not None:
+        fp = os.path.join(home, fp)
+
+    path = None if resolved is None else resolved.get(fp)
+    if path is None:
+        path = os.path.realpath(fp)
+        if resolved is not None:
+            resolved[fp] = path
+
+    level = 'info'
+    if entity.get('level') == 'error' or (entity.get('errorLevel') or 0) >= 2:
+        level = 'error'
+    elif entity.get('level') == 'warning' or entity.get('errorLevel') == 1:
+        level = 'warning'
+
+    line = entity.get('line') or '1'
+    return [ path, line, level, entity.get('message') or '', entity.get('artifactClass'), entity.get('artifactClassAbbr') ]
+
+# load deteceted problem
+# Output: [ [ file, line, message ], ... ]
+def li_load_problems(path, home = None):
+    with li_trace_span('li_load_problems', { 'path': path }):
+        data   = []
+        reader = liEntitiesReader(path)
+        for entity in reader.read():
+            problem = li_entity_to_problem(entity, home, reader.resolved)
+            if problem is not None:
+                data.append([ problem[0], problem[1], problem[3] ])
+        return data
+
+# Problems detected by lithium commands indexed by file path. Problems
+# are shown as regions in views the problems belong to. Problems known
+# from the problems database (owner 0) are kept till the files are re-checked.
+class liProblemStore:
+    KNOWN = 0
+
+    def __init__(self):
+        self.lock     = threading.Lock()
+        self.problems = {}  # { path: [ [ path, line, level, message, artifact class, artifact abbr, owner ], ... ] }
+
+    # Drop problems the given owners (jobs ids) have detected and problems of
+    # the given files detected by any owner except the kept ones
+    # Input: owners - set of jobs ids, paths - set of files, keep - set of jobs ids
+    def clear(self, owners, paths = None, keep = None):
+        keep  = set([ self.KNOWN ]) | (keep or set())
+        paths = paths or set()
+        with self.lock:
+            changed = []
+            for path in list(self.problems.keys()):
+                problems = [ p for p in self.problems[path] if p[6] not in owners and (p[6] in keep or path not in paths) ]
+                if len(problems) != len(self.problems[path]):
+                    changed.append(path)
+                    if len(problems) == 0:
+                        del self.problems[path]
+                    else:
+                        self.problems[path] = problems
+        if len(changed) > 0:
+            self.apply_to_views(changed)
+
+    # Replace known problems of the given files, the files problems the
+    # given owners have detected are dropped
+    # Input: problems - { path: [ [ path, line, level, message, artifact class, artifact abbr ], ... ] }, owners - set of jobs ids
+    def set_known(self, problems, owners = None):
+        drop = set([ self.KNOWN ]) | (owners or set())
+        with self.lock:
+            for path in problems:
+                known = [ p for p in self.problems.get(path, []) if p[6] not in drop ] + [ p[:6] + [ self.KNOWN ] for p in problems[path] ]
+                if len(known) == 0:
+                    self.problems.pop(path, None)
+                else:
+                    self.problems[path] = known
+        if len(problems) > 0:
+            self.apply_to_views(set(problems.keys()))
+
+    # Input: entities - lithium std entities, home - project home, owner - id of job the problems come from,
+    #        resolved - { file: real path } files resolved for the entities batch
+    def add(self, entities, home = None, owner = None, resolved = None):
+        paths    = set()
+        resolved = {} if resolved is None else resolved
+        with self.lock:
+            for entity in entities:
+                problem = li_entity_to_problem(entity, home, resolved)
+                if problem is not None:
+                    problem.append(owner)
+                    self.problems.setdefault(problem[0], []).append(problem)
+                    paths.add(problem[0])
+
+        if len(paths) > 0:
+            self.apply_to_views(paths)
+
+    def get(self, path):
+        with self.lock:
+            return [ p[:6] for p in self.problems.get(os.path.realpath(path), []) ]
+
+    def apply_to_views(self, paths):
+        def apply():
+            for window in sublime.windows():
+                for view in window.views():
+                    fn = view.file_name()
+                    if fn is not None and os.path.realpath(fn) in paths:
+                        self.apply(view)
+        sublime.set_timeout(apply, 0)
+
+    # attach problems regions to the given view
+    def apply(self, view):
+        fn = view.file_name()
+        if fn is None:
+            return
+
+        regions = { 'error': [], 'warning': [] }
+        for problem in self.get(fn):
+            if problem[2] in regions:
+                try:
+                    pt = view.text_point(max(int(problem[1]) - 1, 0), 0)
+                    regions[problem[2]].append(view.line(pt))
+                except ValueError:
+                    pass
+
+        flags = sublime.DRAW_NO_FILL | sublime.DRAW_NO_OUTLINE | sublime.DRAW_SQUIGGLY_UNDERLINE | sublime.DRAW_SOLID_UNDERLINE
+        view.add_regions('lithium_errors',   regions['error'],   'region.redish',    'circle', flags)
+        view.add_regions('lithium_warnings', regions['warning'], 'region.yellowish', 'dot',    flags)
+
+li_problems = liProblemStore()
+
+# Problems database kept in project ".lithium/problems.db". Files a lithium
+# command has checked are recorded with their modification time and content
+# hash, so problems are known as soon as the project is re-opened and files
+# changed since the last check can be found.
+class liProblemDb:
+    def __init__(self):
+        self.lock     = threading.Lock()
+        self.restored = set() # homes known problems have been restored for
+
+    def db_path(self, home):
+        return os.path.join(home, '.lithium', 'problems.db')
+
+    def exists(self, home):
+        return os.path.exists(self.db_path(home))
+
+    def connect(self, home):
+        os.makedirs(os.path.dirname(self.db_path(home)), exist_ok = True)
+        conn = sqlite3.connect(self.db_path(home), check_same_thread = False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS files (path TEXT, prefix TEXT, mtime REAL, hash TEXT, checked REAL, PRIMARY KEY (path, prefix))")
+        conn.execute("CREATE TABLE IF NOT EXISTS problems (path TEXT, prefix TEXT, line TEXT, level TEXT, message TEXT, artifact_class TEXT, artifact_abbr TEXT)")
+        conn.execute("CREATE INDEX IF NOT EXISTS problems_path ON problems (path, prefix)")
+        return conn
+
+    # Output: hex SHA1 of the given file content
+    def hash(self, path):
+        digest = hashlib.sha1()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(65536), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    # Output: { path: [ [ path, line, level, message, artifact class, artifact abbr ], ... ] } problems of the given files
+    def problems(self, conn, home, paths):
+        problems = {}
+        for path in paths:
+            rows = conn.execute("SELECT line, level, message, artifact_class, artifact_abbr FROM problems WHERE path = ?", (os.path.relpath(path, home),))
+            problems[path] = [ [ path ] + list(row) for row in rows ]
+        return problems
+
+    # Record problems lithium command has detected for the given files
+    # Input: prefix - command artifact prefix ("check"), paths - files the command has been run for,
+    #        entities - lithium std entities the command has written
+    # Output: { path: [ problem, ... ] } known problems of the given files
+    def record(self, home, prefix, paths, entities):
+        home     = os.path.realpath(home)
+        found    = {}
+        resolved = {}
+        for entity in entities:
+            problem = li_entity_to_problem(entity, home, resolved)
+            if problem is not None and problem[0] in paths:
+                found.setdefault(problem[0], []).append(problem)
+
+        with self.lock:
+            conn = self.connect(home)
+            try:
+                for path in paths:
+                    rel = os.path.relpath(path, home)
+                    conn.execute("DELETE FROM problems WHERE path = ? AND prefix = ?", (rel, prefix))
+                    try:
+                        state = [ os.path.getmtime(path), self.hash(path) ]
+                    except OSError:
+                        conn.execute("DELETE FROM files WHERE path = ? AND prefix = ?", (rel, prefix))
+                        continue
+
+                    conn.execute("INSERT OR REPLACE INTO files (path, prefix, mtime, hash, checked) VALUES (?, ?, ?, ?, ?)", [ rel, prefix ] + state + [ time.time() ])
+                    conn.executemany("INSERT INTO problems (path, prefix, line, level, message, artifact_class, artifact_abbr) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                     [ [ rel, prefix ] + p[1:6] for p in found.get(path, []) ])
+                conn.commit()
+                return self.problems(conn, home, paths)
+            finally:
+                conn.close()
+
+    # Collect recorded files and compare them with the files on disk. Files
+    # whose modification time only has changed are re-stamped, removed files
+    # are forgotten.
+    # Output: [ set(up to date paths), { prefix: set(changed paths) }, set(removed paths) ]
+    def compare(self, conn, home):
+        actual, changed, removed = set(), {}, set()
+        for (rel, prefix, mtime, hash) in conn.execute("SELECT path, prefix, mtime, hash FROM files").fetchall():
+            path = os.path.join(home, rel)
+            try:
+                current = os.path.getmtime(path)
+                if current != mtime:
+                    if self.hash(path) != hash:
+                        changed.setdefault(prefix, set()).add(path)
+                        continue
+                    conn.execute("UPDATE files SET mtime = ? WHERE path = ? AND prefix = ?", (current, rel, prefix))
+                actual.add(path)
+            except OSError:
+                removed.add(path)
+                conn.execute("DELETE FROM files WHERE path = ?", (rel,))
+                conn.execute("DELETE FROM problems WHERE path = ?", (rel,))
+        conn.commit()
+        return [ actual - set(p for paths in changed.values() for p in paths), changed, removed ]
+
+    # Show problems of files that have not been changed since they were checked
+    def restore(self, home):
+        with self.lock:
+            if home in self.restored or not self.exists(home):
+                return
+            self.restored.add(home)
+
+            started = time.time()
+            conn    = self.connect(home)
+            try:
+                actual, changed, removed = self.compare(conn, home)
+                problems = self.problems(conn, home, actual)
+            finally:
+                conn.close()
+
+        li_problems.set_known(problems)
+        if li_is_debug():
+            print("liProblemDb.restore(): %i files problems restored, %i files are stale in %.1fms" %
+                  (len(problems), sum(len(paths) for paths in changed.values()), (time.time() - started) * 1000))
+
+    # Output: { prefix: set(paths) } files whose content has changed since they were checked
+    def stale(self, home):
+        if not self.exists(home):
+            return {}
+
+        with self.lock:
+            conn = self.connect(home)
+            try:
+                actual, changed, removed = self.compare(conn, home)
+            finally:
+                conn.close()
+
+        # problems of removed files are not actual anymore
+        li_problems.set_known(dict((path, []) for path in removed))
+        return changed
+
+li_problem_db = liProblemDb()
+
+# Output: True if problems the given command prefix detects are recorded in problems database
+def li_problem_db_enabled(prefix, home):
+    return home is not None and prefix in (settings.get('problem_db_prefixes') or [])
+
+# Lithium command job that runs with its own output panel, locations index
+# and lithium std entities file
+class liJob:
+    last_id = 0
+
+    def __init__(self, command, window, home = None, priority = 0, artifact = None, trace = None):
+        liJob.last_id = liJob.last_id + 1
+
+        self.id         = liJob.last_id
+        self.command    = command
+        self.window     = window
+        self.home       = home
+        self.priority   = priority
+        self.artifact   = command if artifact is None else artifact  # jobs for the same artifact supersede each other
+        self.panel_name = "%s-%i" % (settings.get('output_panel'), self.id)
+        self.panel      = None
+        self.handle     = None
+        self.state      = 'queued' # queued, running, done, cancelled, superseded
+        self.locations  = liLocationIndex()
+        self.output_buffer     = None
+        self.log_path          = None
+        self.entities_reader   = None
+        self.std_entities_path = None
+        # artifact prefix and files the command checks, problems of known files are recorded in problems database
+        self.prefix   = None
+        self.paths    = None
+        self.entities = []
+        if home is not None:
+            self.std_entities_path = os.path.join(home, '.lithium', 'std-out-entities-%i.json' % self.id)
+
+        self.trace = trace
+        if trace is not None:
+            trace.hold()
+
+    def __str__(self):
+        return "#%i %s [%s]" % (self.id, self.command, self.state)
+
+    # called in UI thread
+    def start(self):
+        if self.state == 'cancelled':
+            li_jobs.done(self)
+            self.release_trace()
+            return
+
+        with li_tracing(self.trace):
+            self.launch()
+
+    def launch(self):
+        if self.trace is not None:
+            self.trace.add('queued', self.trace.started, time.time(), { 'job': self.id })
+
+        try:
+            self.open_output()
+
+            options = dict(settings.get("li_opts"))
+            if self.home is not None:
+                options['basedir'] = self.home
+
+            if self.std_entities_path is not None:
+                options['std_entities'] = self.std_entities_path
+                if os.path.exists(self.std_entities_path):
+                    os.remove(self.std_entities_path)
+
+            # problems of the previous run of the command and of the files it re-builds are outdated
+            li_problems.clear(li_jobs.rerun_ids(self), self.paths, li_jobs.running_ids())
+            self.handle = li_run(self.command, self.output, self.error, True, options, False)
+
+            # problems are shown as soon as lithium detects them
+            if self.std_entities_path is not None:
+                self.entities_reader = liEntitiesReader(self.std_entities_path)
+                self.poll_problems(self.entities_reader)
+        except Exception as ex:
+            sublime.error_message("Lithium '%s' command execution has failed('%s')" % (self.command, str(ex)))
+            self.finish()
+
+    # create the job output panel and full output log
+    def open_output(self):
+        self.panel         = li_init_output_view(self.panel_name, self.window)
+        self.log_path      = li_new_log_path(self.home, self.id)
+        self.output_buffer = liOutputBuffer(self.panel, None, None, self.log_path, self.locations.trim)
+        self.window.run_command("show_panel", { "panel": "output." + self.panel_name })
+
+    def cancel(self):
+        self.state = 'cancelled'
+        if self.handle is not None:
+            self.handle.cancel()
+
+    def error(self, command, err):
+        sublime.error_message("Lithium '%s' command execution failed: ('%s')" % (command, str(err)))
+        self.finish()
+
+    # read problems lithium has detected so far and re-schedule itself till the command is running
+    def poll_problems(self, reader, done = False):
+        entities = reader.read()
+        if self.paths is not None:
+            self.entities.extend(entities)
+
+        if self.trace is None:
+            li_problems.add(entities, self.home, self.id, reader.resolved)
+        else:
+            with self.trace.span('problems'):
+                li_problems.add(entities, self.home, self.id, reader.resolved)
+        if not done and reader is self.entities_reader:
+            sublime.set_timeout_async(lambda: self.poll_problems(reader), settings.get('problems_poll_interval'))
+
+    def output(self, process, line):
+        if line is None:
+            self.finish()
+        else:
+            self.locations.feed(line)
+            self.output_buffer.write(line)
+
+    def finish(self):
+        if self.output_buffer is not None:
+            self.output_buffer.close()
+
+        li_host_folders.clear() # the command can create or remove lithium projects
+        if self.entities_reader is not None:
+            reader = self.entities_reader
+            self.entities_reader = None
+            self.poll_problems(reader, True)
+            try:
+                os.remove(reader.path)
+            except OSError:
+                pass
+
+        if self.state == 'running':
+            self.state = 'done'
+            if self.paths is not None and li_problem_db_enabled(self.prefix, self.home):
+                sublime.set_timeout_async(self.record, 0)
+        self.handle = None
+        li_jobs.done(self)
+
+        # trace is completed after the rest of output has been flushed to panel
+        sublime.set_timeout(self.release_trace, 0)
+
+    # record the command problems in problems database, the job problems become known ones
+    def record(self):
+        try:
+            li_problems.set_known(li_problem_db.record(self.home, self.prefix, self.paths, self.entities), set([ self.id ]))
+        except (OSError, sqlite3.Error) as ex:
+            print("liJob.record(): problems of '%s' cannot be recorded (%s)" % (self.command, str(ex)))
+
+    def release_trace(self):
+        trace, self.trace = self.trace, None
+        if trace is not None:
+            trace.release()
+
+# Lithium jobs scheduler: runs bounded number of jobs concurrently and
+# queues the rest ordered by priority
+class liJobManager:
+    def __init__(self):
+        self.lock     = threading.Lock()
+        self.queue    = []  # queued jobs
+        self.running  = []  # running jobs
+        self.finished = deque()  # recently finished jobs whose panels are kept
+        self.runs     = {}       # { (artifact, home): id of the latest started job }
+
+    def submit(self, job):
+        with self.lock:
+            for queued in [ j for j in self.queue if j.artifact == job.artifact and j.window.id() == job.window.id() ]:
+                queued.state = 'superseded'
+                self.queue.remove(queued)
+                queued.release_trace()
+
+            self.queue.append(job)
+            self.queue.sort(key = lambda j : (-j.priority, j.id))
+        self.schedule()
+        return job
+
+    def schedule(self):
+        started = []
+        with self.lock:
+            while len(self.running) < settings.get('max_jobs') and len(self.queue) > 0:
+                job       = self.queue.pop(0)
+                job.state = 'running'
+                self.running.append(job)
+                started.append(job)
+
+        for job in started:
+            sublime.set_timeout(job.start, 0)
+        self.update_status()
+
+    def done(self, job):
+        destroy = []
+        with self.lock:
+            if job in self.running:
+                self.running.remove(job)
+                self.finished.append(job)
+                while len(self.finished) > settings.get('max_job_panels'):
+                    destroy.append(self.finished.popleft())
+
+        for old in destroy:
+            sublime.set_timeout(lambda old = old: old.window.destroy_output_panel(old.panel_name), 0)
+        self.schedule()
+
+    def cancel(self, job):
+        with self.lock:
+            if job in self.queue:
+                self.queue.remove(job)
+                job.state = 'cancelled'
+                job.release_trace()
+                job = None
+
+        if job is not None:
+            job.cancel()
+        self.update_status()
+
+    def jobs(self):
+        with self.lock:
+            return self.running + self.queue
+
+    def running_ids(self):
+        with self.lock:
+            return set([ job.id for job in self.running ])
+
+    # Register the given started job as the latest run of its artifact
+    # Output: set of ids of the job artifact previous runs
+    def rerun_ids(self, job):
+        with self.lock:
+            previous = self.runs.get((job.artifact, job.home))
+            self.runs[(job.artifact, job.home)] = job.id
+        return set() if previous is None else set([ previous ])
+
+    def job_by_panel(self, name):
+        with self.lock:
+            for job in self.running + list(self.finished):
+                if job.panel_name == name:
+                    return job
+        return None
+
+    # the most recently started job of the given window
+    def last_job(self, window):
+        with self.lock:
+            jobs = [ job for job in self.running + list(self.finished) if job.window.id() == window.id() and job.panel is not None ]
+        return max(jobs, key = lambda j : j.id) if len(jobs) > 0 else None
+
+    def update_status(self):
+        with self.lock:
+            running, queued = len(self.running), len(self.queue)
+
+        text = "" if running + queued == 0 else "Lithium: %i running, %i queued" % (running, queued)
+        def update():
+            for window in sublime.windows():
+                view = window.active_view()
+                if view is not None:
+                    view.set_status('lithium_jobs', text)
+        sublime.set_timeout(update, 0)
+
+li_jobs = liJobManager()
+
+class liCommand(sublime_plugin.WindowCommand):
+    def is_enabled(self, **args):
+        return True
+
+    def run(self, **args):
+        trace = liTrace(args.get('command', '')) if settings.get('trace') else None
+        with li_tracing(trace):
+            self.submit(trace, **args)
+
+        if trace is not None:
+            trace.release()
+
+    def submit(self, trace, **args):
+        # save current edited view if necessary
+        active_view = sublime.active_window().active_view()
+        if active_view is not None and active_view.is_dirty():
+            active_view.window().run_command('save')
+
+        if li_is_debug():
+            print("liCommand.run(): self = " + str(self))
+
+        # fetch command from args list
+        command = ""
+        if "command" in args:
+            command = args["command"]
+
+        if li_is_debug():
+            print("liCommand.run(): command = " + command + "," + li_view_to_s(active_view))
+
+        # detect home folder
+        li_home = li_project_home()
+
+        # collect place holders values in dictionary
+        placeholders = {}
+        if li_home is None:
+            if li_is_debug():
+                print("liCommand.run(): project home directory cannot be detected")
+        else:
+            hm = li_home
+            # wrap with quotas path that contains spaces
+            if hm != "\"" and hm.find(" ") > 0:
+                hm = "\"" + hm + "\""
+
+            placeholders['home'] = hm
+            if li_is_debug():
+                print("liCommand.run(): Detected home folder " + str(li_home))
+
+        if active_view.file_name() != None:
+            fn = active_view.file_name()
+            # wrap with quotas path that contains spaces
+            if fn[0] != "\"" and fn.find(" ") > 0:
+                placeholders['file'] = "\"" + fn + "\""
+            else:
+                placeholders['file'] = fn
+
+            if fn is not None and os.path.exists(fn):
+                src_folder = li_detect_host_folder(fn, 'src')
+                if src_folder is None:
+                    placeholders['src_home'] = os.path.join(fn, 'src')
+                else:
+                    placeholders['src_home'] = os.path.join(src_folder, 'src')
+
+        # apply placeholders to command line
+        try:
+            command = command.format(**placeholders)
+        except KeyError:
+            sublime.error_message("Lithium command '%s' cannot be interpolated with %s" % (command, str(placeholders)))
+
+        if trace is not None:
+            trace.name, trace.home = command, li_home
+
+        job = liJob(command, self.window, li_home, args.get('priority', 0), None, trace)
+        # command for one file ("check:/a/Foo.java") problems are recorded in problems database
+        target = re.match(r'^"?([\w.\-]+):(.+?)"?$', command)
+        if target is not None and os.path.isfile(target.group(2)):
+            job.prefix, job.paths = target.group(1), set([ os.path.realpath(target.group(2)) ])
+        li_jobs.submit(job)
+
+# Cancel running or queued lithium job
+class liCancelJobCommand(sublime_plugin.WindowCommand):
+    def run(self, **args):
+        self.jobs = li_jobs.jobs()
+        if args.get('all', False):
+            for job in self.jobs:
+                li_jobs.cancel(job)
+        elif len(self.jobs) == 1:
+            li_jobs.cancel(self.jobs[0])
+        elif len(self.jobs) > 1:
+            self.window.show_quick_panel([ str(job) for job in self.jobs ], self.done)
+        else:
+            sublime.status_message("Lithium: there is no job to cancel")
+
+    def done(self, index):
+        if index >= 0:
+            li_jobs.cancel(self.jobs[index])
+
+# Lithium command that runs the given artifact prefix for the given files
+# Input: prefix - artifact name prefix ("compile"), paths - set of files with the same extension
+# Output: lithium command, many files are passed as one mask "prefix:/common/{a/Foo,b/Bar}.java"
+def li_files_command(prefix, paths):
+    paths = sorted(paths)
+    if len(paths) == 1:
+        target = paths[0]
+    else:
+        # the mask keeps the extension at the end to be matched by project.rb artifacts rules
+        ext    = os.path.splitext(paths[0])[1]
+        common = os.path.dirname(os.path.commonprefix([ p + os.sep for p in paths ]))
+        names  = [ os.path.relpath(p, common)[:-len(ext)] for p in paths ]
+        target = os.path.join(common, "{" + ",".join(names) + "}" + ext)
+    return '"%s:%s"' % (prefix, target)
+
+# Split the given files to groups that can be passed with li_files_command(),
+# files whose names can break the mask are put in separate groups
+# Output: [ set(paths), ... ]
+def li_mask_groups(paths):
+    plain  = set([ p for p in paths if re.search(r"[\{\},\[\]\*\?\"]", p) is None ])
+    groups = [ set([ p ]) for p in set(paths) - plain ]
+    if len(plain) > 0:
+        groups.append(plain)
+    return groups
+
+# Split the given files of a mask group to chunks whose li_files_command() mask
+# fits "command_max_length" bytes, a shell refuses (E2BIG) too long argument
+# Output: [ [ path, ... ], ... ]
+def li_command_chunks(paths, limit = None):
+    limit  = settings.get('command_max_length') if limit is None else limit
+    chunks = []
+    chunk, size = [], 0
+    for path in sorted(paths):
+        # path length is an upper bound of the path contribution to the mask
+        length = len(path.encode('utf-8')) + 1
+        if len(chunk) > 0 and size + length > limit:
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(path)
+        size = size + length
+    if len(chunk) > 0:
+        chunks.append(chunk)
+    return chunks
+
+# Build saved files with lithium. Saves are debounced and saved files of the
+# same project and extension are built with one lithium command that replaces
+# stale command building any of the files
+class liSaveBuilder:
+    def __init__(self):
+        self.lock       = threading.Lock()
+        self.pending    = OrderedDict() # { (window id, home, ext): [ window, set(paths) ] }
+        self.jobs       = {}            # { path: job }
+        self.generation = 0
+
+    def save(self, view):
+        fn = view.file_name()
+        if fn is None or view.window() is None:
+            return
+
+        ext = os.path.splitext(fn)[1]
+        if ext not in settings.get('compile_on_save_extensions'):
+            return
+
+        home = li_detect_host_folder(fn)
+        if home is None:
+            return
+
+        with self.lock:
+            key = (view.window().id(), os.path.realpath(home), ext)
+            self.pending.setdefault(key, [ view.window(), set() ])[1].add(os.path.realpath(fn))
+            self.generation = self.generation + 1
+            generation      = self.generation
+
+        sublime.set_timeout_async(lambda: self.flush(generation), settings.get('compile_on_save_delay'))
+
+    # Input: paths - set of files with the same extension
+    # Output: lithium command that builds the given files
+    def command(self, paths):
+        return li_files_command(settings.get('compile_on_save'), paths)
+
+    def flush(self, generation):
+        with self.lock:
+            # a newer save has re-scheduled flushing
+            if generation != self.generation:
+                return
+            pending      = self.pending
+            self.pending = OrderedDict()
+
+        for (window_id, home, ext), (window, paths) in pending.items():
+            for group in li_mask_groups(paths):
+                with self.lock:
+                    stale = set([ self.jobs[p] for p in group if p in self.jobs and self.jobs[p].state in ('queued', 'running') ])
+
+                # files of cancelled stale command are re-built with new one
+                for old in stale:
+                    group = group | old.paths
+
+                job        = liJob(self.command(group), window, home)
+                job.paths  = group
+                job.prefix = settings.get('compile_on_save')
+                with self.lock:
+                    for p in group:
+                        self.jobs[p] = job
+                    for p in [ p for p in self.jobs if self.jobs[p].state in ('done', 'cancelled', 'superseded') ]:
+                        del self.jobs[p]
+
+                for old in stale:
+                    li_jobs.cancel(old)
+                li_jobs.submit(job)
+
+li_save_builder = liSaveBuilder()
+
+# Collect files of the given files and folders the bulk command can be run for
+# and partition them by project home and extension
+# Output: OrderedDict({ (home, ext): [ path, ... ] })
+def li_bulk_partitions(paths, extensions = None):
+    extensions = settings.get('compile_on_save_extensions') if extensions is None else extensions
+    files      = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames[:] = [ d for d in dirnames if not d.startswith('.') ]
+                for filename in filenames:
+                    files.add(os.path.realpath(os.path.join(dirpath, filename)))
+        elif os.path.isfile(path):
+            files.add(os.path.realpath(path))
+
+    partitions = OrderedDict()
+    for path in sorted(files):
+        ext = os.path.splitext(path)[1]
+        if ext in extensions:
+            home = li_detect_host_folder(path)
+            if home is not None:
+                partitions.setdefault((os.path.realpath(home), ext), []).append(path)
+    return partitions
+
+# Split the partitions files to chunks every lithium process of a bulk
+# command is run for. Number of chunks follows the number of workers, but
+# a chunk is not less than "bulk_chunk_min" and not more than "bulk_chunk_max" files
+# and its files mask does not exceed "command_max_length" bytes
+# Output: [ [ home, ext, set(paths) ], ... ]
+def li_bulk_chunks(partitions, workers):
+    total  = sum(len(files) for files in partitions.values())
+    chunks = []
+    for (home, ext), files in partitions.items():
+        for group in li_mask_groups(files):
+            group = sorted(group)
+            count = max(1, round(workers * len(group) / total))
+            count = min(count, (len(group) + settings.get('bulk_chunk_min') - 1) // settings.get('bulk_chunk_min'))
+            count = max(count, (len(group) + settings.get('bulk_chunk_max') - 1) // settings.get('bulk_chunk_max'))
+            size  = (len(group) + count - 1) // count
+            for i in range(0, len(group), size):
+                for chunk in li_command_chunks(group[i:i + size]):
+                    chunks.append([ home, ext, set(chunk) ])
+    return chunks
+
+# Job that runs lithium command for many files with a bounded pool of
+# parallel lithium processes. Output of every chunk is put in the job panel
+# as one block with a header when the chunk is completed, a summary is
+# printed at the end
+class liBulkJob(liJob):
+    def __init__(self, prefix, chunks, window, workers = None, trace = None):
+        workers = settings.get('bulk_jobs') if workers is None else workers
+        homes   = set(chunk[0] for chunk in chunks)
+        files   = sorted(p for c in chunks for p in c[2])
+        # bulk jobs started for the same files supersede each other
+        super().__init__("%s: %i files" % (prefix, len(files)), window, homes.pop() if len(homes) == 1 else None, 0,
+                         "%s:%s" % (prefix, hashlib.sha1("\n".join(files).encode('utf-8')).hexdigest()), trace)
+
+        self.prefix  = prefix
+        self.chunks  = chunks
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.lock    = threading.Lock()
+        self.handles = []
+        self.results = []  # [ [ chunk, exit code, errors, warnings ], ... ]
+        self.pool    = None
+
+    def launch(self):
+        try:
+            self.open_output()
+            li_problems.clear(li_jobs.rerun_ids(self), set(p for chunk in self.chunks for p in chunk[2]), li_jobs.running_ids())
+            self.started = time.time()
+            self.pool    = concurrent.futures.ThreadPoolExecutor(max_workers = self.workers)
+            for index, chunk in enumerate(self.chunks):
+                self.pool.submit(self.run_chunk, index, chunk)
+        except Exception as ex:
+            sublime.error_message("Lithium '%s' command execution has failed('%s')" % (self.command, str(ex)))
+            self.finish()
+
+    def run_chunk(self, index, chunk):
+        home, ext, paths = chunk
+        command  = li_files_command(self.prefix, paths)
+        lines    = []
+        def output(process, line):
+            if line is not None:
+                lines.append(line)
+
+        code     = None
+        entities = []
+        resolved = {}
+        started  = time.time()
+        if self.state != 'cancelled':
+            options = dict(settings.get("li_opts"))
+            options['basedir']      = home
+            options['std_entities'] = os.path.join(home, '.lithium', 'std-out-entities-%i-%i.json' % (self.id, index))
+            try:
+                with li_tracing(self.trace):
+                    handle = li_run(command, output, None, False, options, False, self.handles.append)
+                code = handle.future.result() if not handle.future.cancelled() else None
+            except Exception as ex:
+                lines.append("Lithium command has failed ('%s')" % str(ex))
+
+            reader   = liEntitiesReader(options['std_entities'])
+            entities = reader.read()
+            resolved = reader.resolved
+            try:
+                os.remove(options['std_entities'])
+            except OSError:
+                pass
+
+        problems = [ li_entity_to_problem(e, home, resolved) for e in entities ]
+        # problems of the chunk files recorded in problems database are shown as known ones
+        known    = None
+        if code is not None and li_problem_db_enabled(self.prefix, home):
+            try:
+                known = li_problem_db.record(home, self.prefix, paths, entities)
+            except (OSError, sqlite3.Error) as ex:
+                lines.append("Lithium problems cannot be recorded ('%s')" % str(ex))
+        errors   = len([ p for p in problems if p is not None and p[2] == 'error' ])
+        warnings = len([ p for p in problems if p is not None and p[2] == 'warning' ])
+        status   = 'cancelled' if code is None else ('ok' if code == 0 else 'failed (%s)' % code)
+
+        with self.lock:
+            self.results.append([ chunk, code, errors, warnings ])
+            text = "==== [%i/%i] %s:*%s, %i files in %s ====\n" % (len(self.results), len(self.chunks), self.prefix, ext, len(paths), home)
+            text = text + "".join(line + "\n" for line in lines)
+            text = text + "==== %s, %i errors, %i warnings in %.1fs ====\n\n" % (status, errors, warnings, time.time() - started)
+            self.locations.feed(text)
+            self.output_buffer.write(text)
+            if known is None:
+                li_problems.add(entities, home, self.id, resolved)
+            else:
+                li_problems.set_known(known)
+                li_problems.add([ e for i, e in enumerate(entities) if problems[i] is not None and problems[i][0] not in paths ], home, self.id, resolved)
+            completed = len(self.results) == len(self.chunks)
+
+        if completed:
+            self.summary()
+            self.finish()
+
+    def summary(self):
+        failed   = [ r for r in self.results if r[1] != 0 ]
+        files    = sum(len(r[0][2]) for r in self.results)
+        errors   = sum(r[2] for r in self.results)
+        warnings = sum(r[3] for r in self.results)
+        self.output_buffer.write("==== %s: %i files, %i processes (%i parallel), %i failed, %i errors, %i warnings in %.1fs ====\n" %
+                                 (self.prefix, files, len(self.results), self.workers, len(failed), errors, warnings, time.time() - self.started))
+
+    def cancel(self):
+        self.state = 'cancelled'
+        with self.lock:
+            handles = list(self.handles)
+        for handle in handles:
+            handle.cancel()
+
+    def finish(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait = False)
+        super().finish()
+
+# Run lithium command prefix ("compile", "check") for files and folders
+# selected in sidebar
+class liBulkCommand(sublime_plugin.WindowCommand):
+    def run(self, paths = [], command = 'compile'):
+        # big trees are walked in background
+        def collect():
+            partitions = li_bulk_partitions(paths)
+            sublime.set_timeout(lambda: self.submit(command, partitions), 0)
+        sublime.set_timeout_async(collect, 0)
+
+    # Input: partitions - { (home, ext): [ path, ... ] }
+    def submit(self, command, partitions):
+        if len(partitions) == 0:
+            sublime.status_message("Lithium: there are no files to %s" % command)
+            return
+
+        trace = liTrace(command) if settings.get('trace') else None
+        job   = liBulkJob(command, li_bulk_chunks(partitions, settings.get('bulk_jobs') or os.cpu_count() or 1), self.window, None, trace)
+        if trace is not None:
+            trace.home = job.home
+            trace.release()
+        li_jobs.submit(job)
+
+    def is_enabled(self, paths = [], command = 'compile'):
+        return len(paths) > 0
+
+# Re-run lithium commands for project files that have been changed since
+# their problems were recorded in problems database
+class liRecheckStaleCommand(sublime_plugin.WindowCommand):
+    def run(self):
+        home = li_project_home()
+        if home is None or not li_problem_db.exists(home):
+            sublime.status_message("Lithium: there are no recorded problems to re-check")
+            return
+
+        home = os.path.realpath(home)
+        def collect():
+            stale = li_problem_db.stale(home)
+            sublime.set_timeout(lambda: self.recheck(home, stale), 0)
+        sublime.set_timeout_async(collect, 0)
+
+    # Input: stale - { prefix: set(paths) }
+    def recheck(self, home, stale):
+        stale = dict((prefix, paths) for prefix, paths in stale.items() if li_problem_db_enabled(prefix, home) and len(paths) > 0)
+        if len(stale) == 0:
+            sublime.status_message("Lithium: there are no changed files to re-check")
+            return
+
+        workers = settings.get('bulk_jobs') or os.cpu_count() or 1
+        for prefix, paths in stale.items():
+            partitions = OrderedDict()
+            for path in sorted(paths):
+                partitions.setdefault((home, os.path.splitext(path)[1]), []).append(path)
+            li_jobs.submit(liBulkJob(prefix, li_bulk_chunks(partitions, workers), self.window))
+
+        sublime.status_message("Lithium: re-checking %i changed files" % sum(len(paths) for paths in stale.values()))
@@ -0,0 +1,750 @@
+import sublime, sublime_plugin
+
+import threading, time
+import os, re, mmap
+from bisect   import bisect_right
+from datetime import datetime
+
+from .settings import settings, li_is_debug
+from .runner   import li_current_trace, li_executor, li_project_home, li_private_folder, li_show_items, li_show_message, li_view_to_s
+
+# Lithium output panels, output locations parsing and full output logs
+
+# Job whose output is shown in the panel with the given name. Jobs module
+# depends on the module, so the jobs manager is looked up on call
+def li_job_by_panel(name):
+    from .jobs import li_jobs
+    return li_jobs.job_by_panel(name)
+
+# Return lithium output view.
+# Output: lithium output view
+def li_output_view(window = None):
+    if window is None:
+        window = sublime.active_window()
+
+    # active lithium job panel or the panel of the window latest job
+    active = window.active_panel()
+    if active is not None and active.startswith('output.'):
+        job = li_job_by_panel(active[len('output.'):])
+        if job is not None:
+            return job.panel
+
+    from .jobs import li_jobs
+    job = li_jobs.last_job(window)
+    if job is not None:
+        return job.panel
+
+    return window.find_output_panel(settings.get('output_panel'))
+
+def li_output_error_view():
+    return sublime.active_window().find_output_panel(settings.get('output_error_panel'))
+
+# Append text to output view
+# Input: text, view (optional)
+def li_append_output_view(text, view = None):
+    if view is None:
+        view = li_output_view()
+        if view is None:
+            view = li_init_output_view()
+    view.run_command('append', { 'characters' :  text, 'force': True, 'scroll_to_end': True })
+
+def li_append_output_error_view(text, view = None):
+    if view is None:
+        view = li_output_error_view()
+    view.run_command('append', { 'characters' :  text, 'force': True, 'scroll_to_end': True })
+
+# Buffered output stage between lithium process reader thread and output
+# panel. Lines are coalesced into chunks that are appended to the panel
+# with one "append" command per flush by timer or buffer size.
+class liOutputBuffer:
+    def __init__(self, view = None, interval = None, max_size = None, log_path = None, on_trim = None):
+        self.view        = view
+        self.interval    = settings.get('output_flush_interval') if interval is None else interval
+        self.max_size    = settings.get('output_flush_size') if max_size is None else max_size
+        self.lock        = threading.Lock()
+        self.chunks      = []
+        self.size        = 0
+        self.scheduled   = False
+        self.forced      = False
+        self.started     = time.time()
+        self.lines_count = 0
+        self.bytes_count = 0
+        self.flushes     = 0
+        self.trace       = li_current_trace()
+        self.max_lines   = settings.get('output_max_lines')
+        self.panel_lines = 0
+        self.on_trim     = on_trim  # called with number of characters removed from the panel head
+        self.log_path    = log_path # complete output is spilled to the file
+        self.log         = None
+        if log_path is not None:
+            self.log = open(log_path, 'w', encoding = 'utf-8')
+
+    # can be called from any thread
+    def write(self, text):
+        with self.lock:
+            if self.log is not None:
+                self.log.write(text)
+            self.chunks.append(text)
+            size             = len(text)
+            self.size        = self.size + size
+            self.lines_count = self.lines_count + 1
+            self.bytes_count = self.bytes_count + size
+
+            if self.size >= self.max_size:
+                if not self.forced:
+                    self.forced = True
+                    sublime.set_timeout(self.flush, 0)
+            elif not self.scheduled:
+                self.scheduled = True
+                sublime.set_timeout(self.flush, self.interval)
+
+    # called in UI thread
+    def flush(self):
+        with self.lock:
+            text           = "".join(self.chunks)
+            self.chunks    = []
+            self.size      = 0
+            self.scheduled = False
+            self.forced    = False
+
+        if len(text) > 0:
+            self.flushes = self.flushes + 1
+
+            # the chunk exceeds the panel limit itself, the panel is cleared and
+            # only the chunk tail is appended instead of trimming appended text
+            lines = text.count("\n")
+            if self.view is not None and self.max_lines is not None and lines > self.max_lines:
+                start = len(text)
+                for i in range(self.max_lines + 1):
+                    start = text.rfind("\n", 0, start)
+                size = self.view.size() + start + 1
+                self.view.run_command('li_trim_output', { 'size': self.view.size() })
+                text, lines      = text[start + 1:], self.max_lines
+                self.panel_lines = 0
+                if self.on_trim is not None:
+                    self.on_trim(size)
+
+            if self.trace is None:
+                li_append_output_view(text, self.view)
+            else:
+                with self.trace.span('panel append', { 'bytes': len(text) }):
+                    li_append_output_view(text, self.view)
+
+            # trim the panel head when it exceeds the limit by a quarter to not trim it on every flush
+            self.panel_lines = self.panel_lines + lines
+            if self.view is not None and self.max_lines is not None and self.panel_lines > self.max_lines * 1.25:
+                size = self.view.text_point(self.panel_lines - self.max_lines, 0)
+                self.view.run_command('li_trim_output', { 'size': size })
+                self.panel_lines = self.max_lines
+                if self.on_trim is not None:
+                    self.on_trim(size)
+
+    def close(self):
+        sublime.set_timeout(self.flush, 0)
+        with self.lock:
+            if self.log is not None:
+                self.log.close()
+                self.log = None
+        stat = self.throughput()
+        sublime.status_message("Lithium: %i lines, %.0f lines/s, %i panel updates" % (stat['lines'], stat['lines_per_sec'], stat['flushes']))
+
+        if li_is_debug():
+            print("liOutputBuffer.close(): throughput %s" % str(stat))
+
+    # Output: { 'lines', 'bytes', 'flushes', 'seconds', 'lines_per_sec', 'bytes_per_sec' }
+    def throughput(self):
+        seconds = max(time.time() - self.started, 0.001)
+        return {
+            'lines'         : self.lines_count,
+            'bytes'         : self.bytes_count,
+            'flushes'       : self.flushes,
+            'seconds'       : seconds,
+            'lines_per_sec' : self.lines_count / seconds,
+            'bytes_per_sec' : self.bytes_count / seconds
+        }
+
+# Raw tools output location rule. Rule expression is matched only at lines
+# that contain one of the rule "hint" literals, so a rule costs a substring
+# search per parsed text while its hints don't occur. Frames of multi-line
+# rule are matched only at lines that follow the rule header.
+class liLocationRule:
+    def __init__(self, rule, prefix = None):
+        hint = rule.get('hint')
+        self.name  = rule.get('name')
+        self.hints = [ hint ] if isinstance(hint, str) else (hint or [])
+        self.regex = self.compile(rule['header'] if 'header' in rule else rule['pattern'], prefix)
+        self.frame = self.compile(rule['frame'], prefix) if 'frame' in rule else None
+        self.cont  = self.compile(rule['continue'], prefix) if 'continue' in rule else None
+
+    # Expression that starts with "^" is matched at a line start that can be
+    # prefixed with lithium line prefix, others are searched in a line.
+    # Output: [ regex, anchored ], group 1 is the rule expression
+    def compile(self, pattern, prefix):
+        if pattern.startswith('^'):
+            pattern = ("(?:%s)?" % prefix if prefix is not None else "") + "(%s)" % pattern[1:]
+            return [ re.compile(pattern), True ]
+        return [ re.compile("(%s)" % pattern), False ]
+
+    def match(self, regex, text, start, end):
+        return regex[0].match(text, start, end) if regex[1] else regex[0].search(text, start, end)
+
+    # Output: sorted starts of lines that contain one of the rule hints or
+    # all lines starts if the rule has no hints
+    def lines(self, text):
+        if len(self.hints) == 0:
+            return [ 0 ] + [ mt.end() for mt in re.finditer("\n", text) if mt.end() < len(text) ]
+
+        starts = set()
+        for hint in self.hints:
+            pos = text.find(hint)
+            while pos >= 0:
+                starts.add(text.rfind("\n", 0, pos) + 1)
+                end = text.find("\n", pos)
+                pos = -1 if end < 0 else text.find(hint, end)
+        return sorted(starts)
+
+    # Output: [ file, line, message, offset in text ] or None
+    def location(self, mt, message = None):
+        values = mt.groupdict()
+        fn, ln = values.get('file'), values.get('line') or values.get('line2')
+        if fn is None or ln is None:
+            return None
+        if values.get('class') is not None:
+            fn = java_class_source_path(values['class'], fn)
+        if message is None:
+            message = values.get('message') or ''
+        return [ fn.strip(), ln.strip(), message.strip(), mt.start(1) ]
+
+# Compiled place detectors and enabled location rules. Place detectors
+# (lithium "[[file:line]]" markup) are searched in the whole text as is.
+class liLocationGrammar:
+    last = None # [ [ detectors, rules, prefix ], grammar ]
+
+    def __init__(self, detectors, rules, prefix = None):
+        self.detectors = [ re.compile(detector) for detector in detectors ]
+        self.rules     = [ liLocationRule(rule, prefix) for rule in rules ]
+
+    # Input: rules - location rules, rules enabled with "location_rules_enabled" are used by default
+    @classmethod
+    def get(cls, rules = None):
+        if rules is None:
+            enabled = settings.get('location_rules_enabled', [])
+            rules   = [ rule for rule in settings.get('location_rules', []) if rule.get('name') in enabled ]
+
+        key = [ settings.get('place_detectors'), rules, settings.get('location_line_prefix') ]
+        if cls.last is None or cls.last[0] != key:
+            cls.last = [ key, liLocationGrammar(*key) ]
+        return cls.last[1]
+
+# Stateful locations parser fed with output text. Multi-line rule state
+# (header message) is kept between parsed chunks.
+class liLocationParser:
+    def __init__(self, rules = None):
+        self.grammar = liLocationGrammar.get(rules)
+        self.state   = None # [ rule, header message ]
+
+    # Input: text - one or many output lines
+    # Output: [ [ file, line, message, offset in text ], ... ] ordered by offset
+    def parse(self, text):
+        found = []
+        for detector in self.grammar.detectors:
+            for mt in detector.finditer(text):
+                groups = mt.groups()
+                found.append([ groups[0].strip(), groups[1].strip(), groups[2].strip() if len(groups) > 2 else '', mt.start() ])
+
+        if len(self.grammar.rules) > 0:
+            found.extend(self.parse_rules(text))
+            found.sort(key = lambda loc : loc[3])
+        return found
+
+    # Detect locations with location rules only
+    # Output: [ [ file, line, message, offset in text ], ... ]
+    def parse_rules(self, text):
+        found = []
+        state, followed = self.state, 0
+        self.state = None
+        if state is not None:
+            followed = self.follow(state[0], state[1], text, 0, found)
+
+        for rule in self.grammar.rules:
+            skip = followed if state is not None and state[0] is rule else 0
+            for start in rule.lines(text):
+                if start < skip:
+                    continue # the line has been matched as multi-line rule continuation
+
+                end = self.line_end(text, start)
+                mt  = rule.match(rule.regex, text, start, end)
+                if mt is None:
+                    continue
+
+                if rule.frame is None:
+                    loc = rule.location(mt)
+                    if loc is not None:
+                        found.append(loc)
+                else:
+                    skip = self.follow(rule, (mt.groupdict().get('message') or '').strip(), text, end + 1, found)
+        return found
+
+    # Match multi-line rule frames at lines that follow the rule header till
+    # a line that doesn't continue it. The rule state is kept if the text end
+    # has been reached.
+    # Output: offset of the first line that doesn't continue the rule
+    def follow(self, rule, message, text, start, found):
+        while start < len(text):
+            end = self.line_end(text, start)
+            mt  = rule.match(rule.frame, text, start, end)
+            if mt is not None:
+                loc = rule.location(mt, message)
+                if loc is not None:
+                    found.append(loc)
+            else:
+                mt = rule.match(rule.regex, text, start, end)
+                if mt is not None:
+                    message = (mt.groupdict().get('message') or '').strip() # chained exception header
+                elif rule.cont is None or rule.match(rule.cont, text, start, end) is None:
+                    return start
+            start = end + 1
+
+        self.state = [ rule, message ]
+        return len(text)
+
+    def line_end(self, text, offset):
+        end = text.find("\n", offset)
+        return len(text) if end < 0 else end
+
+# Convert class name and source file name taken from stack trace frame to source path
+# Input: class name ("org.pkg.Foo$Inner"), file name ("Foo.java")
+# Output: source path relative to a source root ("org/pkg/Foo.java")
+def java_class_source_path(class_name, file_name):
+    idx = class_name.rfind('.')
+    if idx < 0:
+        return file_name
+    return os.path.join(*(class_name[:idx].split('.') + [ file_name ]))
+
+# Resolve relative location path against project home source roots
+def li_resolve_location_file(path, home = None):
+    if os.path.isabs(path) or os.path.exists(path):
+        return path
+
+    if home is None:
+        home = li_project_home()
+    if home is not None:
+        for root in settings.get('source_roots'):
+            fp = os.path.join(home, root, path)
+            if os.path.exists(fp):
+                return fp
+    return path
+
+# Index of locations detected in lithium output panel. The index is fed with
+# output lines as they stream and keeps locations in panel offsets order.
+class liLocationIndex:
+    def __init__(self, rules = None):
+        self.rules = rules
+        self.lock  = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.locations = []  # [ [ file, line, message, offset ], ... ]
+            self.starts    = []  # panel offset of a line a location has been detected in
+            self.ends      = []  # panel offset of the line end
+            self.size      = 0   # number of characters fed so far
+            self.trimmed   = 0   # number of characters removed from the panel head
+            self.cursor    = -1  # current location for next / previous navigation
+            self.fed       = False
+            self.parser    = liLocationParser(self.rules)
+
+    # Input: size - number of characters the panel head has been trimmed by
+    def trim(self, size):
+        with self.lock:
+            self.trimmed = self.trimmed + size
+
+    # Output: panel offset of the given location or -1 if the location line has been trimmed
+    def offset(self, loc):
+        with self.lock:
+            return max(loc[3] - self.trimmed, -1)
+
+    # Input: text - output line
+    def feed(self, text):
+        with self.lock:
+            found    = self.parser.parse(text)
+            self.fed = True
+            if len(found) > 0:
+                for loc in found:
+                    loc[3] = loc[3] + self.size
+                    self.locations.append(loc)
+                    self.starts.append(self.size)
+                    self.ends.append(self.size + len(text))
+            self.size = self.size + len(text)
+
+    # Output: [ [ file, line, message, offset ], ... ]
+    def items(self):
+        with self.lock:
+            return list(self.locations)
+
+    # Detect location by panel offset
+    # Input: offset
+    # Output: [ file, line, message, offset ] or None
+    def at(self, offset):
+        with self.lock:
+            offset = offset + self.trimmed
+            i = bisect_right(self.starts, offset) - 1
+            if i >= 0 and offset <= self.ends[i]:
+                while i > 0 and self.starts[i - 1] == self.starts[i]:
+                    i = i - 1
+                self.cursor = i
+                return self.locations[i]
+            return None
+
+    def next(self):
+        return self.move(1)
+
+    def previous(self):
+        return self.move(-1)
+
+    def move(self, step):
+        with self.lock:
+            l = len(self.locations)
+            if l == 0:
+                return None
+            if self.cursor < 0 and step < 0:
+                self.cursor = l - 1
+            else:
+                self.cursor = (self.cursor + step) % l
+            return self.locations[self.cursor]
+
+# Parse output view text to detect locations tuples in.
+# Input : view
+# Output: [ (filename, line, description), ... ]
+def li_parse_output_view(view = None):
+    if li_is_debug():
+        print("li_parse_output_view() >> ")
+
+    if view is None:
+        view = li_output_view()
+
+    paths = []
+    for loc in liLocationParser().parse(view.substr(sublime.Region(0, view.size()))):
+        if li_is_debug():
+            print("li_parse_output_view() Detected fn = '" + loc[0] + "', line = " + loc[1])
+
+        paths.append(loc[:3])
+
+    if li_is_debug():
+        print("li_parse_output_view() res = " + str(paths))
+        print("li_parse_output_view() << ")
+
+    return paths
+
+# Parse output text to detect locations tuples in.
+# Input: text
+# Output:  [ (filename, line, description), ... ]
+def li_parse_output(text):
+    parser = liLocationParser()
+    paths  = [ path for detector in parser.grammar.detectors for path in detector.findall(text) ]
+    if len(parser.grammar.rules) > 0:
+        paths.extend([ tuple(loc[:3]) for loc in parser.parse_rules(text) ])
+    return paths
+
+# Detect place(s) by output view region
+def li_parse_output_region(view, region):
+    if view is None:
+        view = li_output_view()
+
+    if region is None:
+        return None
+    else:
+        line   = view.substr(view.line(region))
+        places = li_parse_output(line)
+
+        if li_is_debug():
+            print("li_parse_output_region(): detected places = %s" % str(places))
+
+        return places
+
+def li_init_output_view(name = None, window = None):
+    if name is None:
+        name = settings.get('output_panel')
+    if window is None:
+        window = sublime.active_window()
+    panel = window.create_output_panel(name)
+
+    panel.settings().set("gutter", False)
+    panel.settings().set("font_size", settings.get('output_font_size'))
+    panel.settings().set("line_numbers", False)
+    panel.settings().set("scroll_past_end", False)
+    panel.set_name(name)
+    panel.set_scratch(True)
+    panel.set_read_only(False)
+    panel.set_syntax_file(settings.get('output_syntax'))
+    panel.settings().set("color_scheme", "lithium.sublime-color-scheme")
+
+    if li_is_debug():
+        print("li_init_output_view(): panel = " + str(panel))
+
+    return panel
+
+def li_init_output_error_view():
+    name  = settings.get('output_error_panel')
+    panel = sublime.active_window().create_output_panel(name)
+    panel.settings().set("gutter", False)
+    panel.settings().set("font_size", settings.get('output_font_size'))
+    panel.settings().set("line_numbers", False)
+    panel.settings().set("scroll_past_end", False)
+    panel.set_name(name)
+    panel.set_scratch(True)
+    panel.set_read_only(False)
+    panel.set_syntax_file(settings.get('output_syntax'))
+
+    if li_is_debug():
+        print("li_init_output_error_view(): panel = " + str(panel))
+
+    return panel
+
+# Full output logs folder of the given project home, logs of commands run
+# without project home are kept in the user private folder
+# Output: folder path or None if there is no trusted folder
+def li_logs_folder(home):
+    if home is None:
+        private = li_private_folder()
+        return os.path.join(private, 'logs') if private is not None else None
+    return os.path.join(home, '.lithium', 'logs')
+
+# Create path full command output is spilled to, the oldest logs are removed
+# Output: log path or None if the output is not logged
+def li_new_log_path(home, job_id):
+    folder = li_logs_folder(home)
+    if folder is None:
+        return None
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    logs = sorted([ f for f in os.listdir(folder) if f.startswith('output-') and f.endswith('.log') ])
+    for name in logs[:max(len(logs) - settings.get('output_logs') + 1, 0)]:
+        try:
+            os.remove(os.path.join(folder, name))
+        except OSError:
+            pass
+
+    return os.path.join(folder, "output-%s-%i.log" % (datetime.now().strftime('%Y%m%d-%H%M%S'), job_id))
+
+# Full log of the current output panel command or the latest log of the project
+def li_current_log_path(window):
+    panel = li_output_view(window)
+    if panel is not None:
+        job = li_job_by_panel(panel.name())
+        if job is not None and job.log_path is not None:
+            return job.log_path
+
+    folder = li_logs_folder(li_project_home())
+    if folder is not None and os.path.exists(folder):
+        logs = sorted([ f for f in os.listdir(folder) if f.startswith('output-') and f.endswith('.log') ])
+        if len(logs) > 0:
+            return os.path.join(folder, logs[-1])
+    return None
+
+# Search the given log file with memory mapping, so huge logs are not read in memory
+# Input: path, pattern - regular expression, limit - max number of matched lines
+# Output: [ [ line number, line ], ... ]
+def li_search_log(path, pattern, limit = None):
+    if limit is None:
+        limit = settings.get('log_search_limit')
+
+    res = []
+    if os.path.getsize(path) == 0:
+        return res
+
+    rx = re.compile(pattern.encode('utf-8'), re.IGNORECASE | re.MULTILINE)
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as mm:
+            line_no, pos, last_start = 1, 0, -1
+            for mt in rx.finditer(mm):
+                start = mm.rfind(b"\n", 0, mt.start()) + 1
+                if start == last_start:
+                    continue # one line can match many times
+                line_no    = line_no + mm[pos:start].count(b"\n")
+                pos        = start
+                last_start = start
+                end = mm.find(b"\n", mt.start())
+                res.append([ line_no, mm[start:len(mm) if end < 0 else end].decode('utf-8', 'replace') ])
+                if len(res) >= limit:
+                    break
+    return res
+
+# Detect locations in the given log file with memory mapping, lines are
+# fed to locations parser one by one to keep multi-line rules state
+# Output: [ [ line number, line, [ file, line, message, column ] ], ... ]
+def li_scan_log_locations(path, limit = None):
+    if limit is None:
+        limit = settings.get('log_search_limit')
+
+    res = []
+    if os.path.getsize(path) == 0:
+        return res
+
+    parser = liLocationParser()
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as mm:
+            for line_no, line in enumerate(iter(mm.readline, b""), 1):
+                line = line.decode('utf-8', 'replace').rstrip("\n")
+                found = parser.parse(line)
+                if len(found) > 0:
+                    res.append([ line_no, line, found[0] ])
+                    if len(res) >= limit:
+                        break
+    return res
+
+# Locations index of the current lithium output panel
+def li_current_locations():
+    panel = li_output_view()
+    if panel is not None:
+        job = li_job_by_panel(panel.name())
+        if job is not None:
+            return job.locations
+    return None
+
+# Remove the given number of characters from output panel head
+class liTrimOutputCommand(sublime_plugin.TextCommand):
+    def run(self, edit, size = 0):
+        self.view.erase(edit, sublime.Region(0, size))
+
+# Open complete output of the current output panel command
+class liOpenFullLogCommand(sublime_plugin.WindowCommand):
+    def run(self):
+        path = li_current_log_path(self.window)
+        if path is None:
+            sublime.status_message("Lithium: there is no output log")
+        else:
+            self.window.open_file(path)
+
+# Search complete output of the current output panel command. Empty input
+# lists locations detected in the whole output.
+class liSearchFullLogCommand(sublime_plugin.WindowCommand):
+    def run(self):
+        self.path = li_current_log_path(self.window)
+        if self.path is None:
+            sublime.status_message("Lithium: there is no output log")
+        else:
+            self.window.show_input_panel("Search full log (regexp):", "", self.search, None, None)
+
+    def search(self, pattern):
+        path = self.path
+        def search():
+            try:
+                if pattern.strip() == "":
+                    found = li_scan_log_locations(path)
+                else:
+                    found = li_search_log(path, pattern)
+            except (OSError, ValueError, re.error) as ex:
+                err = str(ex)
+                sublime.set_timeout(lambda: sublime.error_message("Lithium log search has failed ('%s')" % err), 0)
+                return
+
+            self.found = found
+            if len(found) == 0:
+                sublime.status_message("Lithium: nothing has been found")
+            else:
+                sublime.set_timeout(lambda: self.window.show_quick_panel([ "%i: %s" % (f[0], f[1].strip()) for f in found ], self.done), 0)
+
+        li_executor.submit(search)
+
+    def done(self, index):
+        if index >= 0:
+            line_no, line = self.found[index][0], self.found[index][1]
+            places = [ self.found[index][2] ] if len(self.found[index]) > 2 else li_parse_output(line)
+            if len(places) > 0:
+                self.window.open_file(li_resolve_location_file(places[0][0]) + ":" + places[0][1], sublime.ENCODED_POSITION)
+            else:
+                self.window.open_file("%s:%i" % (self.path, line_no), sublime.ENCODED_POSITION)
+
+class liShowLocationsCommand(sublime_plugin.TextCommand):
+    locations = []
+
+    def run(self, edit):
+        locations = li_current_locations()
+        if locations is not None and locations.fed:
+            self.locations = locations.items()
+        else:
+            self.locations = li_parse_output_view()
+
+        if len(self.locations) > 0:
+            locs = [ ["%s:%s" % (location[0], location[1]), location[2]] for location in self.locations ]
+            li_show_items(locs, self.done)
+        else:
+            li_show_message("No locations have been detected ")
+
+    def done(self, i):
+        if i >= 0:
+            self.go_to_location(self.locations[i])
+
+    def go_to_location(self, loc):
+        if loc is not None:
+            win = sublime.active_window()
+            return win.open_file(li_resolve_location_file(loc[0]) + ":" + loc[1], sublime.ENCODED_POSITION)
+        else:
+            li_show_message("No location has been passed")
+            return None
+
+class liGoToLocationCommand(liShowLocationsCommand):
+    def run(self, edit):
+        pan_name = sublime.active_window().active_panel()
+        panel    = None
+        if pan_name == 'output.' + settings.get('output_panel') or li_job_by_panel(pan_name[len('output.'):] if pan_name else None) is not None:
+            panel = li_output_view()
+        elif pan_name == 'output.' + settings.get('output_error_panel'):
+            panel = panel = li_output_error_view()
+
+        if li_is_debug():
+            print("liGoToLocationCommand.run() : GO to text command : " + li_view_to_s(panel))
+
+        if panel is not None:
+            if li_is_debug():
+                print("liGoToLocationCommand.run(): found active output : " + li_view_to_s(panel))
+
+            rset = panel.sel()
+            if len(rset) > 0:
+                p = None
+                job = li_job_by_panel(panel.name())
+                if job is not None and job.locations.fed:
+                    loc = job.locations.at(rset[0].begin())
+                    # location index can be out of sync if the panel has been modified with other commands
+                    if loc is not None and panel.substr(panel.line(rset[0])).find(loc[0]) >= 0:
+                        p = [ loc ]
+
+                if p is None:
+                    p = li_parse_output_region(panel, rset[0])
+                if p == None or len(p) == 0:
+                    if li_is_debug():
+                        print("liGoToLocationCommand.run() : Path to go could not be detected")
+
+                    super().run(edit)
+                else:
+                    if li_is_debug():
+                        print("liGoToLocationCommand.run() : Path to go was found " + str(p))
+
+                    view = self.go_to_location(p[0])
+                    if view is not None:
+                        sublime.active_window().focus_view(view)
+        else:
+            if li_is_debug():
+                print("liGoToLocationCommand.run() : No active view was found")
+
+# Navigate to next or previous detected location
+class liGoToNextLocationCommand(sublime_plugin.WindowCommand):
+    def run(self, back = False):
+        panel     = li_output_view(self.window)
+        locations = li_current_locations()
+        loc       = None
+        if locations is not None:
+            loc = locations.previous() if back else locations.next()
+
+        if loc is None:
+            sublime.status_message("Lithium: no locations have been detected")
+        else:
+            offset = locations.offset(loc)
+            if panel is not None and offset >= 0:
+                panel.sel().clear()
+                panel.sel().add(sublime.Region(offset, offset))
+                panel.show(offset)
+
+            self.window.open_file(li_resolve_location_file(loc[0]) + ":" + loc[1], sublime.ENCODED_POSITION)
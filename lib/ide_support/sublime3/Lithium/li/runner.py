@@ -0,0 +1,656 @@
+import sublime, sublime_plugin
+
+import subprocess, threading, socket, tempfile, hashlib, shlex, time, queue
+import concurrent.futures
+import os, io, platform, json, stat
+from collections import deque
+from contextlib  import contextmanager
+from datetime    import datetime
+
+from .settings import settings, li_is_debug
+
+# Lithium commands runner: project home detection, lithium engine daemon
+# and processes, commands tracing
+
+# Opt-in latency trace of a lithium command invocation. Phases are stored as
+# Chrome trace events and written to ".lithium/traces" when the last holder
+# of the trace (command, job, lithium process handle) releases it.
+class liTrace:
+    last_id = 0
+    recent  = deque(maxlen = 10) # summaries of recently completed traces
+
+    def __init__(self, name, home = None):
+        liTrace.last_id = liTrace.last_id + 1
+
+        self.id      = liTrace.last_id
+        self.name    = name
+        self.home    = home
+        self.lock    = threading.Lock()
+        self.started = time.time()
+        self.events  = []
+        self.stats   = {}
+        self.holds   = 1 # creator holds the trace
+
+    # Input: name, start, end - time.time() timestamps, args - event arguments
+    def add(self, name, start, end, args = None):
+        event = {
+            'name': name,
+            'cat' : 'lithium',
+            'ph'  : 'X',
+            'ts'  : int((start - self.started) * 1000000),
+            'dur' : int((end - start) * 1000000),
+            'pid' : os.getpid(),
+            'tid' : threading.current_thread().name,
+            'args': args or {}
+        }
+        with self.lock:
+            self.events.append(event)
+
+    def instant(self, name, args = None):
+        event = {
+            'name': name,
+            'cat' : 'lithium',
+            'ph'  : 'i',
+            's'   : 't',
+            'ts'  : int((time.time() - self.started) * 1000000),
+            'pid' : os.getpid(),
+            'tid' : threading.current_thread().name,
+            'args': args or {}
+        }
+        with self.lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, args = None):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.time(), args)
+
+    def hold(self):
+        with self.lock:
+            self.holds = self.holds + 1
+
+    def release(self):
+        with self.lock:
+            self.holds = self.holds - 1
+            done       = self.holds == 0
+        if done:
+            self.complete()
+
+    def complete(self):
+        self.add(self.name, self.started, time.time())
+        self.stats['total'] = time.time() - self.started
+        liTrace.recent.append(self.stats)
+
+        try:
+            self.save()
+        except (OSError, ValueError) as ex:
+            print("liTrace.complete(): trace cannot be saved (%s)" % str(ex))
+
+        avg = sum([ st['total'] for st in liTrace.recent ]) / len(liTrace.recent)
+        sublime.status_message("Lithium trace: %s, avg total of last %i: %i ms" % (self.summary(), len(liTrace.recent), avg * 1000))
+
+    # Output: "spawn ms, time to first line, lines/s, total" summary string
+    def summary(self):
+        st  = self.stats
+        res = []
+        if 'spawn' in st:
+            res.append("spawn %i ms" % (st['spawn'] * 1000))
+        if 'first_line' in st:
+            res.append("first line %i ms" % (st['first_line'] * 1000))
+        if 'lines' in st and st.get('output', 0) > 0:
+            res.append("%.0f lines/s" % (st['lines'] / st['output']))
+        res.append("total %i ms" % (st.get('total', time.time() - self.started) * 1000))
+        return ", ".join(res)
+
+    def save(self):
+        if self.home is None:
+            return
+
+        folder = os.path.join(self.home, '.lithium', 'traces')
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        path = os.path.join(folder, "trace-%s-%i.json" % (datetime.now().strftime('%Y%m%d-%H%M%S'), self.id))
+        with self.lock:
+            data = { 'traceEvents': list(self.events), 'otherData': { 'command': self.name, 'stats': self.stats } }
+        with open(path, 'w') as file:
+            json.dump(data, file)
+
+        # keep only configured number of the most recent traces
+        traces = sorted([ f for f in os.listdir(folder) if f.startswith('trace-') and f.endswith('.json') ])
+        for name in traces[:max(len(traces) - settings.get('trace_files'), 0)]:
+            os.remove(os.path.join(folder, name))
+
+        if li_is_debug():
+            print("liTrace.save(): trace has been saved to '%s'" % path)
+
+li_trace_local = threading.local()
+
+# Output: trace of the current thread or None
+def li_current_trace():
+    return getattr(li_trace_local, 'trace', None)
+
+# Make the given trace current for the calling thread
+@contextmanager
+def li_tracing(trace):
+    prev = li_current_trace()
+    li_trace_local.trace = trace
+    try:
+        yield trace
+    finally:
+        li_trace_local.trace = prev
+
+# Trace a phase with the current thread trace if there is one
+@contextmanager
+def li_trace_span(name, args = None):
+    trace = li_current_trace()
+    if trace is None:
+        yield
+    else:
+        with trace.span(name, args):
+            yield
+
+# DEBUG: convert view to its string representation
+def  li_view_to_s(view):
+    if view == None:
+        return "view is [ NONE ]"
+    name = view.file_name()
+    if name == None:
+        name = "NONE"
+    win = view.window()
+    if win == None:
+        wid = "NONE"
+    else:
+        wid = win.id()
+    return "view [ id = " + str(view.id()) + ", name = '" + view.name() + "', winid = " + str(wid) + ", path = " + name + "]"
+
+# Detect lithium project home folder by looking lithium folder up
+# Input: pt is initial path
+# Input: folder_name a folder name to be detected
+# Output: folder that contains folder_name
+def li_detect_host_folder(pt, folder_name = ".lithium"):
+    return li_host_folders.detect(pt, folder_name)
+
+# Cache of detected host folders keyed by path. Detected folders are validated
+# on every hit, absence of a host folder is remembered for configured TTL.
+class liHostFolders:
+    def __init__(self):
+        self.lock    = threading.Lock()
+        self.cache   = {}  # { (path, folder name): [ host folder or None, time ] }
+        self.folders = {}  # { window id: (folder, ...) }
+        self.hits    = 0
+        self.misses  = 0
+
+    def clear(self):
+        with self.lock:
+            self.cache = {}
+
+    # invalidate cache if the window folders have been changed
+    def check_window(self, window):
+        folders = tuple(window.folders())
+        with self.lock:
+            if self.folders.get(window.id()) != folders:
+                self.folders[window.id()] = folders
+                self.cache = {}
+
+    # call with lock acquired
+    def lookup(self, key, now):
+        entry = self.cache.get(key)
+        if entry is not None:
+            if entry[0] is not None:
+                if os.path.isdir(os.path.join(entry[0], key[1])):
+                    return entry
+            elif now - entry[1] < settings.get('home_cache_ttl'):
+                return entry
+            del self.cache[key]
+        return None
+
+    def detect(self, pt, folder_name = ".lithium"):
+        if pt is None:
+            return None
+
+        now = time.time()
+        with self.lock:
+            entry = self.lookup((pt, folder_name), now)
+            if entry is not None:
+                self.hits = self.hits + 1
+                return entry[0]
+            self.misses = self.misses + 1
+
+        host    = None
+        visited = [ pt ]
+        if os.path.abspath(pt) and os.path.exists(pt):
+            if os.path.isfile(pt):
+                pt = os.path.dirname(pt)
+
+            cnt = 0
+            while pt != "/" and pt != None and cnt < 100:
+                with self.lock:
+                    entry = self.lookup((pt, folder_name), now)
+                if entry is not None:
+                    host = entry[0]
+                    break
+
+                visited.append(pt)
+                if os.path.exists(os.path.join(pt, folder_name)):
+                    host = pt
+                    break
+                else:
+                    pt = os.path.dirname(pt)
+                cnt = cnt + 1
+
+        with self.lock:
+            if len(self.cache) > 4096:
+                self.cache = {}
+            for path in visited:
+                self.cache[(path, folder_name)] = [ host, now ]
+        return host
+
+    def stats(self):
+        with self.lock:
+            return { 'hits': self.hits, 'misses': self.misses, 'size': len(self.cache) }
+
+li_host_folders = liHostFolders()
+
+# Show items
+# Input: array of items
+def li_show_items(items, done = None):
+    l = len(items)
+    if l > 0:
+        if li_is_debug():
+            print("li_show_items() : number of items to be shown: " + str(l))
+            for i in range(l):
+                item = items[i]
+                print("li_show_items() : item[" + str(i) + "] = " + str(item))
+
+        sublime.active_window().show_quick_panel(items, done)
+    else:
+        if li_is_debug():
+            print("li_show_items() : No items have been passed")
+
+# show textual message
+def li_show_message(msg):
+    sublime.message_dialog(msg)
+
+# Detect project home directory
+def li_project_home():
+    with li_trace_span('li_project_home'):
+        return li_detect_project_home()
+
+def li_detect_project_home():
+    active_view = sublime.active_window().active_view()
+    li_host_folders.check_window(active_view.window())
+
+    home = None
+    if active_view.file_name() != None:
+        home = li_detect_host_folder(active_view.file_name())
+
+    if home is None:
+        folders = active_view.window().folders()
+        if len(folders) > 0:
+            for folder in folders:
+                home = li_detect_host_folder(folder)
+                if home != None:
+                    break
+
+    if home is not None:
+        home = os.path.realpath(home) # resolve sym link to real path
+
+    if li_is_debug():
+        print("li_project_home(): detected home '%s', cache %s" % (home, str(li_host_folders.stats())))
+
+    return home
+
+LI_DAEMON_END_MARKER = "\0LITHIUM-END"
+
+li_daemon_starts     = {}
+
+# Lithium daemon command handle that mimics subprocess.Popen interface
+class liDaemonProcess:
+    def __init__(self, sock):
+        self.sock       = sock
+        self.stdout     = sock.makefile('rb')
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self):
+        return self.returncode
+
+    # closing connection makes daemon kill the command process
+    def terminate(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def kill(self):
+        self.terminate()
+
+# Private folder of the user lithium daemons sockets, doc cache and logs are
+# kept in. Other local users must not be able to create or replace a socket
+# the plugin sends commands to or read cached data, so the folder has to be
+# owned by the user and closed for others.
+# Output: folder path or None if there is no trusted folder
+def li_private_folder():
+    path = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(), "lithium-%i" % os.getuid())
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    except OSError as ex:
+        print("li_private_folder(): '%s' cannot be created (%s)" % (path, str(ex)))
+        return None
+
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or (st.st_mode & 0o077) != 0:
+        print("li_private_folder(): '%s' is not private folder of the user, it is not used" % path)
+        return None
+    return path
+
+# Unix socket path lithium daemon serves the given project home on
+# Output: socket path or None if there is no trusted sockets folder
+def li_daemon_socket_path(home):
+    folder = li_private_folder()
+    if folder is None:
+        return None
+    key = hashlib.md5(home.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(folder, "lithium-%s.sock" % key)
+
+# Output: True if the given path is a socket the user owns
+def li_daemon_socket_owned(sock_path):
+    try:
+        st = os.lstat(sock_path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+# Connect to lithium daemon of the given project home. The daemon is started
+# lazily in background, None is returned until it is ready to accept commands.
+# Input: home - project home folder
+# Output: connected socket or None
+def li_daemon_connect(home):
+    if not settings.get('daemon') or home is None or not hasattr(socket, 'AF_UNIX') or platform.system() == 'Windows':
+        return None
+
+    sock_path = li_daemon_socket_path(home)
+    if sock_path is None:
+        return None
+
+    if li_daemon_socket_owned(sock_path):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(sock_path)
+            return sock
+        except OSError:
+            sock.close()
+
+    started = li_daemon_starts.get(home)
+    if started is None or time.time() - started > settings.get('daemon_start_timeout'):
+        if li_is_debug():
+            print("li_daemon_connect(): start lithium daemon for '%s' at '%s'" % (home, sock_path))
+
+        li_daemon_starts[home] = time.time()
+        subprocess.Popen(settings.get("path") + " -daemon=" + shlex.quote(sock_path),
+                         shell  = True,
+                         cwd    = home,
+                         stdin  = subprocess.DEVNULL,
+                         stdout = subprocess.DEVNULL,
+                         stderr = subprocess.DEVNULL,
+                         start_new_session = True)
+    return None
+
+# Read lines of lithium process output till the process completion
+# Input: process - subprocess.Popen or liDaemonProcess
+# Output: lines generator
+def li_read_output(process):
+    for line in io.TextIOWrapper(process.stdout, encoding='utf-8', errors='strict'):
+        idx = line.find(LI_DAEMON_END_MARKER)
+        if idx >= 0:
+            process.returncode = int(line[idx + len(LI_DAEMON_END_MARKER):].strip() or 1)
+            if idx > 0:
+                yield line[0:idx]
+            break
+        yield line
+
+    if isinstance(process, liDaemonProcess):
+        if process.returncode is None:
+            process.returncode = -1 # connection has been closed before the command completion
+        process.sock.close()
+
+# Lithium command handle: command output is pumped by a thread pool worker
+# to the output handler or, if no handler has been passed, to a bounded lines
+# queue the handle lines() method streams
+class liRunHandle:
+    def __init__(self, command, process, output_handler = None, error_handler = None, run_async = True):
+        self.command        = command
+        self.process        = process
+        self.output_handler = output_handler
+        self.error_handler  = error_handler
+        self.strip          = not run_async
+        self.cancelled      = False
+        self.future         = None
+        self.queue          = None
+        self.consumed       = False
+        self.spawned        = time.time()
+        self.trace          = li_current_trace()
+        if self.trace is not None:
+            self.trace.hold()
+        if output_handler is None and run_async:
+            self.queue = queue.Queue(settings.get('run_queue_size'))
+
+    # pump command output and complete the handle future with the command exit code
+    def run(self):
+        try:
+            result = self.pump()
+            if not self.future.cancelled():
+                self.future.set_result(result)
+        except Exception as ex:
+            if not self.future.cancelled():
+                self.future.set_exception(ex)
+
+    # pump command output, the method result is the command exit code
+    def pump(self):
+        lines = 0
+        try:
+            for line in li_read_output(self.process):
+                if lines == 0 and self.trace is not None:
+                    self.first_line()
+                lines = lines + 1
+                if self.strip:
+                    line = line.rstrip("\n")
+                if self.queue is not None:
+                    self.put(line)
+                elif self.output_handler is not None:
+                    self.output_handler(self.process, line)
+
+            # tell the last line has been handled
+            self.process.stdout.close()
+            self.process.wait()
+            if self.output_handler is not None:
+                self.output_handler(self.process, None)
+            return self.process.returncode
+        except Exception as ex:
+            if not self.cancelled:
+                print("li_run(): '%s' has failed (%s)" % (self.command, str(ex)))
+                if self.error_handler is not None:
+                    try:
+                        self.error_handler(self.command, ex)
+                    except Exception as ex2:
+                        print(ex2)
+            raise
+        finally:
+            if self.queue is not None:
+                self.put(None)
+            if self.trace is not None:
+                self.trace.stats['lines'] = self.trace.stats.get('lines', 0) + lines
+                if 'first_line_at' in self.trace.stats:
+                    self.trace.stats['output'] = time.time() - self.trace.stats['first_line_at']
+                    self.trace.add('output', self.trace.stats['first_line_at'], time.time(), { 'lines': lines })
+                self.trace.release()
+
+    def first_line(self):
+        now = time.time()
+        self.trace.add('engine startup', self.spawned, now, { 'command': self.command })
+        self.trace.instant('first line')
+        self.trace.stats.setdefault('first_line', now - self.trace.started)
+        self.trace.stats.setdefault('first_line_at', now)
+
+    # blocks while the queue is full, the command is cancelled if lines are
+    # not consumed longer than "run_timeout"
+    def put(self, line):
+        deadline = time.time() + settings.get('run_timeout')
+        while not self.cancelled:
+            try:
+                self.queue.put(line, timeout = 0.1)
+                return
+            except queue.Full:
+                if time.time() > deadline:
+                    print("li_run(): '%s' output is not consumed, the command is cancelled" % self.command)
+                    self.cancel()
+
+    # Stream the command output lines
+    # Input: timeout - seconds the whole output has to be read in
+    def lines(self, timeout = None):
+        if self.queue is None:
+            raise ValueError("Lines of '%s' command are consumed by output handler" % self.command)
+
+        deadline = None if timeout is None else time.time() + timeout
+        while not self.consumed:
+            try:
+                line = self.queue.get(timeout = None if deadline is None else max(deadline - time.time(), 0))
+            except queue.Empty:
+                self.cancel()
+                raise concurrent.futures.TimeoutError("'%s' command has timed out" % self.command)
+
+            if line is None:
+                self.consumed = True
+                break
+            yield line
+
+    # Output: the command exit code
+    def result(self, timeout = None):
+        try:
+            if self.queue is not None:
+                for line in self.lines(timeout):
+                    pass
+            return self.future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            self.cancel()
+            raise
+
+    def done(self):
+        return self.future.done()
+
+    def cancel(self):
+        self.cancelled = True
+        self.future.cancel()
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+        return True
+
+    def terminate(self):
+        self.cancel()
+
+# Pool of short background tasks. Lithium commands output is pumped with a
+# thread per command, so a task can wait for a command it has run.
+li_executor = concurrent.futures.ThreadPoolExecutor(max_workers = 8)
+
+# Run lithium command
+# Input: run_async - False runs the command in the calling thread,
+#        on_start(handle) - called before the command output is pumped
+# Output: liRunHandle
+def li_run(command, output_handler = None, error_handler = None, run_async = True, options = None, show_panel = True, on_start = None):
+    script_path = settings.get("path")
+
+    if options is None:
+        options = dict(settings.get("li_opts")) # ctreate a copy of the object
+
+    if 'basedir' not in options:
+        options['basedir'] = li_project_home()
+
+    options_str = ' '.join("-{!s}={!r}".format(key, val) for (key, val) in options.items())
+
+    process = None
+    spawned = time.time()
+    sock    = li_daemon_connect(options['basedir'])
+    if sock is not None:
+        if li_is_debug():
+            print("liCommand.run(): lithium daemon, opts = " + options_str + ", command = " + command)
+
+        try:
+            request = { 'command': command, 'options': { k: str(v) for (k, v) in options.items() } }
+            sock.sendall((json.dumps(request) + "\n").encode('utf-8'))
+            process = liDaemonProcess(sock)
+        except OSError as ex:
+            print("li_run(): lithium daemon cannot be used ('%s')" % str(ex))
+            sock.close()
+
+    if process is None:
+        if li_is_debug():
+            print("liCommand.run(): subprocess.Popen = " + script_path + ", opts = " + options_str + ", command = " + command)
+
+        # Python 3.3
+        process = subprocess.Popen(script_path + " " + options_str  + " " + command ,
+                                   shell  = True,
+                                   stdin  = subprocess.PIPE,
+                                   stdout = subprocess.PIPE,
+                                   stderr = subprocess.STDOUT,
+                                   universal_newlines = False,
+                                   bufsize = 0)
+
+    trace = li_current_trace()
+    if trace is not None:
+        trace.add('spawn', spawned, time.time(), { 'daemon': isinstance(process, liDaemonProcess) })
+        trace.stats.setdefault('spawn', time.time() - spawned)
+
+    # show lithium output panel, the command can be run from a background thread
+    if show_panel:
+        sublime.set_timeout(lambda: sublime.active_window().run_command("show_panel", { "panel": "output.lithium" }), 0)
+
+    handle = liRunHandle(command, process, output_handler, error_handler, run_async)
+    handle.future = concurrent.futures.Future()
+    if on_start is not None:
+        on_start(handle)
+
+    if run_async:
+        threading.Thread(target = handle.run, name = "lithium: %s" % command, daemon = True).start()
+    else:
+        handle.run()
+
+    return handle
+
+class liTextCommand(sublime_plugin.TextCommand):
+    # trace the command invocation if tracing is enabled
+    def run_(self, edit_token, args):
+        if not settings.get('trace'):
+            return super().run_(edit_token, args)
+
+        trace = liTrace(self.__class__.__name__)
+        try:
+            with li_tracing(trace):
+                trace.home = li_project_home()
+                return super().run_(edit_token, args)
+        finally:
+            trace.release()
+
+    def syntax(self):
+        syntax = os.path.basename(self.view.settings().get('syntax'))
+        syntax = os.path.splitext(syntax)[0]
+        syntax = syntax.lower()
+        return syntax
+
+    def is_enabled(self):
+        syntaxes = self.enabled_syntaxes()
+        if syntaxes is None or len(syntaxes) == 0:
+            return True
+
+        syn = self.syntax()
+        return syn is not None and syn in syntaxes
+
+    def enabled_syntaxes(self):
+        return None
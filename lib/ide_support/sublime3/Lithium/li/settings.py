@@ -0,0 +1,65 @@
+import sublime
+
+import os, json
+
+# Plugin settings. Values are read from "Lithium.sublime-settings" on first
+# access and cached till the settings are changed. Values set with
+# settings[key] = value override the settings file.
+class liSettings:
+    name = 'Lithium.sublime-settings'
+
+    def __init__(self):
+        self.values    = {}
+        self.overrides = {}
+        self.source    = None
+        self.defaults  = None
+
+    def get(self, key, default = None):
+        try:
+            value = self.values[key]
+        except KeyError:
+            value = self.overrides[key] if key in self.overrides else self.load(key)
+            self.values[key] = value
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.overrides[key] = value
+        self.values.pop(key, None)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def load(self, key):
+        if self.source is None:
+            self.source = sublime.load_settings(self.name)
+            self.source.add_on_change('lithium', self.values.clear)
+
+        value = self.source.get(key)
+        if value is None:
+            value = self.file_defaults().get(key)
+        return value
+
+    # Settings file shipped with the plugin is read directly if sublime
+    # settings API is not available (plugin is loaded by a benchmark or tests)
+    def file_defaults(self):
+        if self.defaults is None:
+            path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), self.name)
+            try:
+                with open(path) as file:
+                    lines = [ line for line in file if not line.lstrip().startswith('//') ]
+                self.defaults = json.loads("".join(lines))
+            except (OSError, ValueError) as ex:
+                print("liSettings.file_defaults(): '%s' cannot be read (%s)" % (path, str(ex)))
+                self.defaults = {}
+        return self.defaults
+
+settings = liSettings()
+
+def li_is_debug():
+    return settings.get('debug')
@@ -0,0 +1,398 @@
+#
+#  Headless benchmark of Lithium Sublime plugin hot paths. The script stubs
+#  "sublime" and "sublime_plugin" modules, loads the plugin and measures it
+#  with synthetic workloads:
+#
+#    python3 lithium_bench.py                    - run and compare with baseline
+#    python3 lithium_bench.py --update-baseline  - run and store results as baseline
+#    python3 lithium_bench.py --scale 0.1        - run with 10 times smaller workloads
+#
+#  Result of every benchmark: ops/sec, p50/p99 latency of one operation and
+#  peak memory allocated by one operation. The script exits with 1 if a
+#  benchmark ops/sec is lower than baseline more than the given tolerance.
+#
+import sys, os, re, json, time, types, tempfile, tracemalloc, argparse, platform
+
+BENCH_HOME    = os.path.dirname(os.path.abspath(__file__))
+PLUGIN_HOME   = os.path.join(os.path.dirname(BENCH_HOME), 'Lithium')
+BASELINE_PATH = os.path.join(BENCH_HOME, 'baseline.json')
+
+# Minimal "sublime" API the plugin hot paths rely on
+class Region:
+    def __init__(self, a, b = None):
+        self.a = a
+        self.b = a if b is None else b
+
+    def begin(self):
+        return min(self.a, self.b)
+
+    def end(self):
+        return max(self.a, self.b)
+
+    def size(self):
+        return abs(self.b - self.a)
+
+class Settings(dict):
+    def get(self, key, default = None):
+        return dict.get(self, key, default)
+
+    def set(self, key, value):
+        self[key] = value
+
+    def add_on_change(self, key, callback):
+        pass
+
+class View:
+    last_id = 0
+
+    def __init__(self, text = "", syntax = 'Packages/Java/Java.sublime-syntax'):
+        View.last_id  = View.last_id + 1
+        self.vid      = View.last_id
+        self.text     = text
+        self.changes  = 0
+        self.name_str = ""
+        self.view_settings = Settings({ 'syntax': syntax })
+
+    def id(self):
+        return self.vid
+
+    def name(self):
+        return self.name_str
+
+    def set_name(self, name):
+        self.name_str = name
+
+    def settings(self):
+        return self.view_settings
+
+    def size(self):
+        return len(self.text)
+
+    def change_count(self):
+        return self.changes
+
+    def file_name(self):
+        return None
+
+    def window(self):
+        return None
+
+    def substr(self, region):
+        if isinstance(region, int):
+            return self.text[region:region + 1]
+        return self.text[region.begin():region.end()]
+
+    def line(self, region):
+        pt    = region if isinstance(region, int) else region.begin()
+        start = self.text.rfind("\n", 0, pt) + 1
+        end   = self.text.find("\n", pt)
+        return Region(start, len(self.text) if end < 0 else end)
+
+    def text_point(self, row, col):
+        pt = 0
+        for i in range(row):
+            pt = self.text.find("\n", pt) + 1
+            if pt == 0:
+                return len(self.text)
+        return pt + col
+
+    def rowcol(self, pt):
+        row = self.text.count("\n", 0, pt)
+        return (row, pt - self.text.rfind("\n", 0, pt) - 1)
+
+    def find_all(self, pattern, flags = 0, fmt = None, extractions = None):
+        regions = []
+        for mt in re.finditer(pattern, self.text, re.IGNORECASE if flags & IGNORECASE else 0):
+            regions.append(Region(mt.start(), mt.end()))
+            if extractions is not None and fmt is not None:
+                extractions.append(mt.expand(fmt))
+        return regions
+
+    def run_command(self, name, args = None):
+        if name == 'append':
+            self.text    = self.text + args['characters']
+            self.changes = self.changes + 1
+        elif name == 'li_trim_output':
+            self.text    = self.text[args['size']:]
+            self.changes = self.changes + 1
+
+    def set_scratch(self, flag): pass
+    def set_read_only(self, flag): pass
+    def set_syntax_file(self, path): pass
+    def add_regions(self, *args): pass
+
+class Window:
+    def __init__(self):
+        self.panels = {}
+
+    def id(self):
+        return 1
+
+    def create_output_panel(self, name):
+        self.panels[name] = View()
+        return self.panels[name]
+
+    def find_output_panel(self, name):
+        return self.panels.get(name)
+
+    def destroy_output_panel(self, name):
+        self.panels.pop(name, None)
+
+    def active_panel(self):
+        return None
+
+    def active_view(self):
+        return None
+
+    def folders(self):
+        return []
+
+    def views(self):
+        return []
+
+    def run_command(self, name, args = None):
+        pass
+
+ui_queue    = []   # callbacks scheduled with set_timeout, run by run_ui()
+main_window = Window()
+IGNORECASE  = 2
+
+def set_timeout(callback, delay = 0):
+    ui_queue.append(callback)
+
+def run_ui():
+    while len(ui_queue) > 0:
+        ui_queue.pop(0)()
+
+def stub_modules():
+    sublime = types.ModuleType('sublime')
+    sublime.Region            = Region
+    sublime.IGNORECASE        = IGNORECASE
+    sublime.ENCODED_POSITION  = 1
+    sublime.HIDE_ON_MOUSE_MOVE_AWAY = 4
+    sublime.DRAW_NO_FILL      = 32
+    sublime.DRAW_NO_OUTLINE   = 256
+    sublime.DRAW_SOLID_UNDERLINE    = 512
+    sublime.DRAW_SQUIGGLY_UNDERLINE = 1024
+    sublime.active_window     = lambda: main_window
+    sublime.windows           = lambda: [ main_window ]
+    sublime.set_timeout       = set_timeout
+    sublime.set_timeout_async = set_timeout
+    sublime.load_settings     = lambda name: Settings()
+    sublime.status_message    = lambda msg: None
+    sublime.error_message     = lambda msg: print("ERROR: %s" % msg)
+    sublime.message_dialog    = lambda msg: print("MESSAGE: %s" % msg)
+
+    sublime_plugin = types.ModuleType('sublime_plugin')
+    class Command:
+        def __init__(self, arg = None):
+            self.view   = arg
+            self.window = arg
+    sublime_plugin.TextCommand   = Command
+    sublime_plugin.WindowCommand = Command
+    sublime_plugin.EventListener = object
+
+    sys.modules['sublime']        = sublime
+    sys.modules['sublime_plugin'] = sublime_plugin
+
+# Plugin subsystems names are looked up in
+class Plugin:
+    def __init__(self, modules):
+        self.modules = modules
+
+    def __getattr__(self, name):
+        for module in self.modules:
+            if hasattr(module, name):
+                return getattr(module, name)
+        raise AttributeError(name)
+
+def load_plugin():
+    stub_modules()
+    sys.path.insert(0, os.path.dirname(PLUGIN_HOME))
+    import importlib
+    modules = [ importlib.import_module('Lithium.li.' + name) for name in ('settings', 'runner', 'output', 'jobs', 'java', 'docs') ]
+    modules[0].settings['daemon'] = False
+    return Plugin(modules)
+
+# Import plugin entry module from scratch, the "li" package subsystems
+# must not be imported by it
+def plugin_import():
+    for name in [ n for n in sys.modules if n == 'Lithium' or n.startswith('Lithium.') ]:
+        del sys.modules[name]
+    import Lithium.lithium
+    Lithium.lithium.plugin_loaded()
+    loaded = [ n for n in sys.modules if n.startswith('Lithium.li.') and n != 'Lithium.li.settings' ]
+    if len(loaded) > 0:
+        raise AssertionError("Subsystems have been imported at plugin load: %s" % loaded)
+
+# Synthetic workloads
+# Output: compiler log text where every 20th line refers to a source location
+def compiler_log(lines):
+    res = []
+    for i in range(lines):
+        if i % 20 == 0:
+            res.append("(E) [JVC]  [[/home/user/project/src/main/java/org/lithium/pkg%i/Class%i.java:%i]] cannot find symbol: variable v%i\n" % (i % 50, i, i % 900 + 1, i))
+        else:
+            res.append("(I) [JVC]  Compiling '/home/user/project/src/main/java/org/lithium/pkg%i/Class%i.java' source file\n" % (i % 50, i))
+    return res
+
+# Output: JAVA source code with the given number of imports
+def java_source(imports):
+    res = [ "/*\n * Copyright\n */\npackage org.lithium.bench;\n\n" ]
+    for i in range(imports):
+        if i % 3 == 0:
+            res.append("import java.util.pkg%i.Class%i;\n" % (i % 40, i))
+        elif i % 3 == 1:
+            res.append("import org.lithium.pkg%i.Class%i;\n" % (i % 40, i))
+        else:
+            res.append("import static com.vendor.pkg%i.Class%i.CONST;\n" % (i % 40, i))
+    res.append("\npublic class Bench {\n")
+    for i in range(1000):
+        res.append("    private Class%i field%i; // usage\n" % (i, i))
+    res.append("}\n")
+    return "".join(res)
+
+# Output: path to lithium std entities file of the given size
+def entities_file(folder, size):
+    path = os.path.join(folder, 'std-out-entities.json')
+    with open(path, 'w') as file:
+        file.write("[\n")
+        written, i = 0, 0
+        while written < size:
+            entity = json.dumps({
+                'patternClass'      : 'JavaCompilerPattern',
+                'artifactClass'     : 'JavaCompiler',
+                'artifactClassAbbr' : 'JVC',
+                'errorLevel'        : 2 if i % 3 == 0 else 1,
+                'file'              : 'src/main/java/org/lithium/pkg%i/Class%i.java' % (i % 50, i % 2000),
+                'line'              : str(i % 900 + 1),
+                'message'           : 'cannot find symbol: variable v%i' % i
+            })
+            line    = ("" if i == 0 else ",") + entity + "\n"
+            written = written + len(line)
+            i       = i + 1
+            file.write(line)
+        file.write("]\n")
+    return path
+
+# Run the given operation "repeat" times
+# Output: { 'ops_per_sec', 'p50_ms', 'p99_ms', 'peak_kb' }
+def measure(operation, repeat):
+    operation() # warm up caches and compiled regular expressions
+
+    latencies = []
+    started   = time.perf_counter()
+    for i in range(repeat):
+        t = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - t)
+    total = time.perf_counter() - started
+
+    # peak memory is measured separately, tracing slows operations down
+    tracemalloc.start()
+    operation()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'ops_per_sec' : repeat / max(total, 1e-9),
+        'p50_ms'      : latencies[len(latencies) // 2] * 1000,
+        'p99_ms'      : latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        'peak_kb'     : peak / 1024
+    }
+
+# Output: [ [ name, operation, repeat ], ... ]
+def benchmarks(lithium, scale, folder):
+    log_lines   = compiler_log(int(100000 * scale))
+    log_text    = "".join(log_lines)
+    log_view    = View(log_text)
+    source_view = View(java_source(int(5000 * scale)))
+    entities    = entities_file(folder, int(50 * 1024 * 1024 * scale))
+    imports     = lithium.java_scan_header(source_view)['imports']
+
+    def output_append():
+        panel  = lithium.li_init_output_view('lithium-bench', main_window)
+        buffer = lithium.liOutputBuffer(panel)
+        for line in log_lines:
+            buffer.write(line)
+        buffer.close()
+        run_ui()
+
+    def parse_output_rules():
+        # all raw tools location rules are enabled
+        lithium.liLocationParser(lithium.settings.get('location_rules')).parse(log_text)
+
+    def collect_imports():
+        # memoized header is invalidated to measure scanning
+        source_view.changes = source_view.changes + 1
+        lithium.java_collect_imports(source_view)
+
+    return [
+        [ 'plugin_import',              plugin_import,                                      20 ],
+        [ 'li_parse_output',            lambda: lithium.li_parse_output(log_text),          5 ],
+        [ 'li_parse_output_view',       lambda: lithium.li_parse_output_view(log_view),     5 ],
+        [ 'li_parse_output_rules',      parse_output_rules,                                 5 ],
+        [ 'java_collect_imports',       collect_imports,                                    20 ],
+        [ 'group_imports',              lambda: lithium.java_group_imports(imports),        20 ],
+        [ 'output_append',              output_append,                                      5 ],
+        [ 'li_load_problems',           lambda: lithium.li_load_problems(entities, folder), 3 ]
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description = "Lithium Sublime plugin benchmark")
+    parser.add_argument('--scale',           type = float, default = 1.0,  help = "workloads size factor")
+    parser.add_argument('--tolerance',       type = float, default = 0.25, help = "allowed ops/sec drop relatively to baseline")
+    parser.add_argument('--baseline',        default = BASELINE_PATH,      help = "baseline file path")
+    parser.add_argument('--update-baseline', action = 'store_true',        help = "store results as new baseline")
+    parser.add_argument('--filter',          default = None,               help = "regular expression to select benchmarks")
+    args = parser.parse_args()
+
+    lithium = load_plugin()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline.get('scale') != args.scale:
+            print("Baseline has been collected with %s scale, comparison is skipped" % baseline.get('scale'))
+            baseline = {}
+
+    results     = {}
+    regressions = []
+    with tempfile.TemporaryDirectory() as folder:
+        print("%-24s %12s %10s %10s %12s %10s" % ("benchmark", "ops/sec", "p50 ms", "p99 ms", "peak KB", "baseline"))
+        for name, operation, repeat in benchmarks(lithium, args.scale, folder):
+            if args.filter is not None and re.search(args.filter, name) is None:
+                continue
+
+            res           = measure(operation, repeat)
+            results[name] = res
+            base          = baseline.get('results', {}).get(name)
+            delta         = ""
+            if base is not None:
+                ratio = res['ops_per_sec'] / base['ops_per_sec']
+                delta = "%+.0f%%" % ((ratio - 1) * 100)
+                if ratio < 1 - args.tolerance:
+                    regressions.append(name)
+                    delta = delta + " !"
+
+            print("%-24s %12.2f %10.2f %10.2f %12.0f %10s" % (name, res['ops_per_sec'], res['p50_ms'], res['p99_ms'], res['peak_kb'], delta))
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump({
+                'scale'   : args.scale,
+                'python'  : platform.python_version(),
+                'machine' : platform.machine(),
+                'results' : results
+            }, file, indent = 4, sort_keys = True)
+            file.write("\n")
+        print("Baseline has been stored in '%s'" % args.baseline)
+
+    if len(regressions) > 0:
+        print("Performance regression has been detected: %s" % ", ".join(regressions))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
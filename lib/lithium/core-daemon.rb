@@ -0,0 +1,130 @@
+require 'socket'
+require 'json'
+require 'shellwords'
+require 'rbconfig'
+
+#
+#  Lithium engine daemon keeps lithium code preloaded and serves commands
+#  over an UNIX socket. Every command is executed in a forked process, so
+#  a command gets clean lithium state without paying engine startup cost.
+#
+#  Protocol: a client sends one JSON line:
+#      { "command": "compile:file.java", "options": { "std": "SublimeStd" }, "basedir": "/project/home" }
+#  The daemon streams the command output back and completes it with
+#  "#{DAEMON_END_MARKER} <exit code>" line.
+#
+DAEMON_END_MARKER  = "\u0000LITHIUM-END"
+DAEMON_IDLE_TIMEOUT = 3600 # seconds
+
+#  Collect modification times of lithium code and projects definitions
+#  the daemon depends on
+def daemon_signature(basedirs)
+    files = Dir.glob(File.join($lithium_code, 'lib', '**', '*.rb'))
+    files.push(File.join($lithium_code, 'project.rb'))
+    basedirs.each { | basedir |
+        files.push(File.join(basedir, '.lithium', 'project.rb'))
+    }
+    files.collect { | f | File.exist?(f) ? "#{f}:#{File.mtime(f).to_f}" : f }.sort.join('|')
+end
+
+def DAEMON(sock_path)
+    daemon_pid = Process.pid
+
+    # the daemon runs commands of anybody who can connect, so the socket has
+    # to be in a folder other users cannot access
+    sock_dir = File.lstat(File.dirname(sock_path))
+    if !sock_dir.directory? || !sock_dir.owned? || sock_dir.mode & 0077 != 0
+        raise "Daemon socket folder '#{File.dirname(sock_path)}' has to be owned by the user and closed for others"
+    end
+    File.delete(sock_path) if File.exist?(sock_path)
+
+    # preload lithium engine
+    require 'lithium/core-startup'
+
+    basedirs  = []
+    signature = daemon_signature(basedirs)
+    running   = 0
+    restart   = false
+    lock      = Mutex.new
+    server    = UNIXServer.new(sock_path)
+    File.chmod(0600, sock_path)
+
+    at_exit {
+        File.delete(sock_path) if Process.pid == daemon_pid && File.exist?(sock_path)
+    }
+
+    last_activity = Time.now
+    loop {
+        rs = IO.select([ server ], nil, nil, 1)
+        if rs.nil?
+            if lock.synchronize { running > 0 }
+                last_activity = Time.now
+                next
+            end
+
+            break if Time.now - last_activity > DAEMON_IDLE_TIMEOUT
+            next  unless restart
+
+            # lithium code or projects definitions have been changed, reload itself
+            server.close
+            File.delete(sock_path) if File.exist?(sock_path)
+            Kernel.exec(RbConfig.ruby, File.join($lithium_code, 'lib', 'lithium.rb'), "-daemon=#{sock_path}")
+        end
+
+        client = server.accept
+        last_activity = Time.now
+        lock.synchronize { running = running + 1 }
+
+        Thread.new(client) { | cl |
+            pid = nil
+            begin
+                req     = JSON.parse(cl.gets || '{}')
+                options = req['options'] || {}
+                options['basedir'] = req['basedir'] unless req['basedir'].nil?
+                argv    = options.collect { | k, v | "-#{k}=#{v}" } + Shellwords.split(req['command'].to_s)
+
+                lock.synchronize {
+                    restart = true if daemon_signature(basedirs) != signature
+                    if !options['basedir'].nil? && !basedirs.include?(options['basedir'])
+                        basedirs.push(options['basedir'])
+                        signature = daemon_signature(basedirs) unless restart
+                    end
+                }
+
+                if restart
+                    # preloaded code is stale, run the command with fresh lithium instance
+                    pid = Process.spawn(RbConfig.ruby, File.join($lithium_code, 'lib', 'lithium.rb'), *argv,
+                                        :in => :close, :out => cl, :err => cl, :pgroup => true)
+                else
+                    pid = fork {
+                        Process.setsid
+                        server.close
+                        STDOUT.reopen(cl)
+                        STDERR.reopen(cl)
+                        $stdout, $stderr = STDOUT, STDERR
+                        LITHIUM(argv)
+                    }
+                end
+
+                # client closes connection to cancel the command
+                done = false
+                Thread.new {
+                    begin
+                        cl.read
+                    rescue
+                    end
+                    Process.kill('TERM', -pid) rescue nil unless done
+                }
+
+                _, status = Process.wait2(pid)
+                done = true
+                cl.write("#{DAEMON_END_MARKER} #{status.exitstatus.nil? ? 1 : status.exitstatus}\n")
+            rescue Exception => e
+                cl.write("#{e.message}\n#{DAEMON_END_MARKER} 1\n") rescue nil
+            ensure
+                cl.close rescue nil
+                lock.synchronize { running = running - 1 }
+            end
+        }
+    }
+end
@@ -0,0 +1,173 @@
+require 'json'
+require 'digest'
+require 'fileutils'
+
+require 'lithium/core'
+
+#  Results cache of file masks that check files with an external tool
+#  (checkstyle, jshint, PMD). Output lines the tool has printed for a file
+#  are kept with the tool config hash and the file content hash. Lines of
+#  not changed files are re-printed to std, so std patterns recognize them
+#  as if the tool has printed them, the tool is run with one invocation for
+#  the rest of files. Cache is stored per artifact class as:
+#  {
+#     "version": 1,
+#     "items"  : { "<path>": { "config": <sha1>, "hash": <sha1>, "failed": <bool>, "lines": [ ... ] }, ... }
+#  }
+#
+#  Including class implements:
+#   - check_items(paths) { | line | ... } runs the tool for the given full paths, returns exit code
+#   - check_config() returns files and options the tool results depend on
+#   - check_failed?(lines) optionally tests if the file output lines fail the check
+#   - check_status?(code) optionally tests if the tool exit code is not a tool failure
+#   - check_failed(paths) optionally raises the check error
+#
+module CheckResultCache
+    # max length of files arguments passed to one tool invocation
+    CHECK_ARGS_LIMIT = 32000
+
+    def build()
+        cache_path = File.join(homedir, '.lithium', 'check-cache', "#{self.class.name}.json")
+        config     = check_config_hash()
+        items      = check_cache_load(cache_path)
+        failed, misses, hits = [], {}, 0
+
+        list_items { | path, m |
+            fp   = fullpath(path)
+            hash = Digest::SHA1.file(fp).hexdigest
+            item = items[fp]
+            if !item.nil? && item['config'] == config && item['hash'] == hash
+                item['lines'].each { | line | $stdout.puts line }
+                failed.push(fp) if item['failed']
+                hits = hits + 1
+            else
+                misses[fp] = hash
+            end
+        }
+
+        if misses.length > 0
+            lines = {}
+            misses.each_key { | fp | lines[fp] = [] }
+
+            # longest paths first to attribute an output line to the most specific file
+            paths_re = Regexp.union(misses.keys.sort_by { | fp | -fp.length })
+            code, lost = 0, 0
+            check_batches(misses.keys).each { | batch |
+                res = check_items(batch) { | line |
+                    $stdout.puts line
+                    m = paths_re.match(line)
+                    if !m.nil?
+                        lines[m[0]].push(line)
+                    elsif check_location?(line)
+                        lost = lost + 1
+                    end
+                }
+                code = res if code == 0
+            }
+
+            missed_failed = misses.keys.select { | fp | check_failed?(lines[fp]) }
+            raise "#{self.class.name} tool has failed (code = #{code})" unless check_status?(code) || missed_failed.length > 0
+
+            updates = {}
+            misses.each_pair { | fp, hash |
+                updates[fp] = { 'config' => config, 'hash' => hash, 'failed' => missed_failed.include?(fp), 'lines' => lines[fp] }
+            }
+            # a location the tool has reported for a file it cannot be attributed to makes results not cacheable
+            if lost == 0
+                check_cache_save(cache_path, updates)
+            else
+                puts_warning "#{lost} detected location(s) cannot be bound to checked files, results are not cached"
+            end
+            failed.concat(missed_failed)
+        end
+
+        puts "#{hits} of #{hits + misses.length} files results are taken from cache" if hits > 0
+        check_failed(failed) if failed.length > 0
+    end
+
+    # split paths to batches whose command line length doesn't exceed the limit
+    def check_batches(paths)
+        batches, size = [ [] ], 0
+        paths.each { | fp |
+            if size + fp.length + 3 > CHECK_ARGS_LIMIT && batches.last.length > 0
+                batches.push([])
+                size = 0
+            end
+            batches.last.push(fp)
+            size = size + fp.length + 3
+        }
+        return batches
+    end
+
+    # run the given command and pass its output lines to the block
+    def check_exec(*args)
+        res = Artifact.exec(*args) { | stdin, stdout, thread |
+            while line = stdout.gets do
+                yield line.chomp
+            end
+        }
+        return res.exitstatus
+    end
+
+    # test if std patterns of the artifact detect a location in the given line
+    def check_location?(line)
+        clazz = self.class
+        while clazz do
+            patterns = $PATTERNS[clazz.name]
+            return patterns.any? { | pt | !pt.match(line).nil? } if !patterns.nil? && patterns.length > 0
+            clazz = clazz.superclass
+        end
+        return false
+    end
+
+    def check_config_hash()
+        digest = Digest::SHA1.new
+        digest.update(self.class.name)
+        check_config().each { | item |
+            item = item.to_s
+            digest.update("\0#{item}")
+            digest.update(Digest::SHA1.file(item).hexdigest) if File.file?(item)
+        }
+        return digest.hexdigest
+    end
+
+    def check_cache_load(cache_path)
+        if File.exist?(cache_path)
+            begin
+                cache = JSON.parse(File.read(cache_path))
+                return cache['items'] if cache['version'] == 1
+            rescue JSON::ParserError
+                puts_warning "Check results cache '#{cache_path}' is corrupted and will be re-built"
+            end
+        end
+        return {}
+    end
+
+    # merge the given items into cache file that can be updated concurrently
+    # by other lithium processes (parallel bulk chunks), read-merge-write is
+    # serialized with an exclusive lock of the sidecar lock file, items of
+    # removed files are dropped
+    def check_cache_save(cache_path, updates)
+        FileUtils.mkdir_p(File.dirname(cache_path))
+        File.open("#{cache_path}.lock", File::RDWR | File::CREAT, 0644) { | lock |
+            lock.flock(File::LOCK_EX)
+
+            items = check_cache_load(cache_path).merge(updates)
+            items.delete_if { | fp, item | !File.exist?(fp) }
+
+            tmp = "#{cache_path}.#{Process.pid}"
+            File.write(tmp, JSON.generate({ 'version' => 1, 'items' => items }))
+            File.rename(tmp, cache_path)
+        }
+    end
+
+    def check_config() [] end
+
+    def check_failed?(lines) lines.length > 0 end
+
+    def check_status?(code) code == 0 end
+
+    def check_failed(paths)
+        raise "#{self.class.name} check has failed for #{paths.length} file(s)"
+    end
+end
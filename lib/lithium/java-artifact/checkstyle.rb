@@ -2,10 +2,13 @@ require 'fileutils'
 
 require 'lithium/file-artifact/command'
 require 'lithium/file-artifact/acquired'
+require 'lithium/file-artifact/check-cache'
 require 'lithium/java-artifact/base'
+require 'lithium/java-artifact/tools-server'
 
 class JavaCheckStyle < FileMask
     include OptionsSupport
+    include CheckResultCache
 
     def initialize(*args)
         REQUIRE JAVA
@@ -20,12 +23,31 @@ class JavaCheckStyle < FileMask
         puts "Checkstyle home  : '#{@checkstyle_home}'\n           config: '#{@checkstyle_config}'"
     end
 
-    def build_item(path, mt)
-        raise "Cannot run check style" if Artifact.exec(@java.java,
-                                                       '-cp', "\"#{@checkstyle_home}/checkstyle-8.16-all.jar\"",
-                                                       'com.puppycrawl.tools.checkstyle.Main',
-                                                       '-c', "\"#{@checkstyle_config}\"",
-                                                       "\"#{fullpath(path)}\"") != 0
+    def check_items(paths, &block)
+        # warm JavaTools server keeps checkstyle configured, it is used if it is running
+        res = JavaToolsServer.request(homedir, JavaToolsServer.classpath(@java), "checkstyle:#{@checkstyle_config}", paths)
+        unless res.nil?
+            res[1].each(&block)
+            return res[0]
+        end
+
+        check_exec(@java.java,
+                   '-cp', "\"#{@checkstyle_home}/checkstyle-8.16-all.jar\"",
+                   'com.puppycrawl.tools.checkstyle.Main',
+                   '-c', "\"#{@checkstyle_config}\"",
+                   *paths.map { | fp | "\"#{fp}\"" }, &block)
+    end
+
+    # checkstyle version is a part of the jar name, so the jar content is not hashed
+    def check_config() [ @checkstyle_config, 'checkstyle-8.16-all' ] end
+
+    # checkstyle exit code is number of errors, warnings don't fail the check
+    def check_failed?(lines)
+        lines.any? { | line | line.start_with?('[ERROR]') }
+    end
+
+    def check_failed(paths)
+        raise "Check style has detected errors in #{paths.length} file(s)"
     end
 
     def what_it_does() "Check '#{@name}' java code style" end
@@ -43,6 +65,7 @@ end
 #  PMD code analyzer
 class PMD < FileMask
     include OptionsSupport
+    include CheckResultCache
 
     def initialize(*args)
         super
@@ -54,19 +77,24 @@ class PMD < FileMask
         @pmd_cmd    ||= 'run.sh'
     end
 
-    def build_item(path, mt)
-        fp = fullpath(path)
-        raise "PMD target '#{fp}' cannot be found" unless File.exists?(fp)
-
-        status = Artifact.exec(File.join(@pmd_path, 'bin', @pmd_cmd),
-                            'pmd', '-d', "\"#{fp}\"",
-                            '-format', @pmd_format,
-                            '-R', @pmd_rules)
+    # PMD takes comma separated list of files to be analyzed
+    def check_items(paths, &block)
+        check_exec(File.join(@pmd_path, 'bin', @pmd_cmd),
+                   'pmd', '-d', "\"#{paths.join(',')}\"",
+                   '-format', @pmd_format,
+                   '-R', @pmd_rules, &block)
+    end
 
-        ecode = status.exitstatus
-        raise "PMD failed for '#{fp}' code = #{ecode}" if ecode != 0 && ecode != 4
+    def check_config()
+        rules = File.absolute_path?(@pmd_rules) ? @pmd_rules : File.join(@pmd_path, @pmd_rules)
+        [ @pmd_path, @pmd_cmd, @pmd_format, @pmd_rules, rules ]
     end
 
+    # exit code 4 means violations have been found, they don't fail the check
+    def check_status?(code) code == 0 || code == 4 end
+
+    def check_failed?(lines) false end
+
     def what_it_does() "Validate '#{@name}' code applying PMD:#{@pmd_rules}" end
 
     def self.abbr() 'PMD' end
@@ -1,5 +1,10 @@
+require 'json'
+require 'fileutils'
+
 require 'lithium/core'
 require 'lithium/java-artifact/base'
+require 'lithium/java-artifact/jar'
+require 'lithium/java-artifact/tools-server'
 
 class JavaDoc < FileCommand
     #include LogArtifactState
@@ -59,8 +64,16 @@ class ShowClassMethods < EnvArtifact
 
     def build
         cn  = @shortname
+
+        # warm JavaTools server is used if it is running
+        res = JavaToolsServer.request(homedir, JavaToolsServer.classpath(@java), "methods:#{cn}", $lithium_args[0, 1])
+        unless res.nil?
+            res[1].each { | line | puts line }
+            raise "#{self.class.name} failed" if res[0] != 0
+            return
+        end
+
         cp  = @java.classpath().to_s(File.join($lithium_code, 'classes'))
-        
         res = Artifact.exec(
             @java.java,
             '-classpath', "\"#{cp}\"",
@@ -130,6 +143,15 @@ class FindClassInClasspath < FindInClasspath
     end
 
     def build
+        # warm JavaTools server looks the class up in JDK and classpath items it keeps listed
+        res = JavaToolsServer.request(homedir, JavaToolsServer.classpath(@java), "find:#{@target}")
+        unless res.nil?
+            res[1].each { | line | puts "    #{line}" }
+            puts_warning "No item for '#{@target}' has been found" if res[1].length == 0
+            raise "#{self.class.name} failed" if res[0] != 0
+            return
+        end
+
         Artifact.exec(
             @java.java, 
             '-classpath',
@@ -155,6 +177,149 @@ class FindClassInClasspath < FindInClasspath
     def self.abbr() 'FCC' end
 end
 
+#
+#  Maintain on-disk simple class name index of the artifact classpath that is
+#  read by IDE plugins directly. A classpath item is re-scanned only if its
+#  size or modification time has been changed. The index is stored as:
+#  {
+#     "version": 1,
+#     "items"  : { "<path>": { "size": <int>, "mtime": <int>, "classes": [ "a.b.C", ... ] }, ... }
+#  }
+#
+class IndexClasspath < FileCommand
+    include ZipTool
+
+    def initialize(*args)
+        REQUIRE JAVA
+        super
+        @index_path ||= File.join(homedir, '.lithium', 'classpath-index.json')
+    end
+
+    def build()
+        index, text = { 'version' => 1, 'items' => {} }, nil
+        if File.exists?(@index_path)
+            begin
+                text  = File.read(@index_path)
+                index = JSON.parse(text)
+            rescue JSON::ParserError
+                puts_warning "Classpath index '#{@index_path}' is corrupted and will be re-built"
+            end
+        end
+
+        items, updated = {}, 0
+        @java.classpath.paths.each { | path |
+            next unless File.exists?(path)
+
+            stat = File.stat(path)
+            item = index['items'][path]
+            if item.nil? || File.directory?(path) || item['size'] != stat.size || item['mtime'] != stat.mtime.to_i
+                item = { 'size' => stat.size, 'mtime' => stat.mtime.to_i, 'classes' => list_classes(path) }
+                updated = updated + 1
+            end
+            items[path] = item
+        }
+
+        # JDK classes are listed with JavaTools and re-scanned only if Java home has been changed
+        jdk_key = "jdk:#{@java.java_home}"
+        item    = index['items'][jdk_key]
+        if item.nil? || item['mtime'] != File.mtime(@java.java_home).to_i
+            item = { 'size' => 0, 'mtime' => File.mtime(@java.java_home).to_i, 'classes' => list_jdk_classes() }
+            updated = updated + 1
+        end
+        items[jdk_key] = item
+
+        # the index is not re-written if nothing has been changed, IDE plugins
+        # re-load the index when its modification time is changed
+        index['items'] = items
+        json           = JSON.generate(index)
+        if json == text
+            puts "Classpath index '#{@index_path}': #{items.length} items, up to date"
+        else
+            FileUtils.mkdir_p(File.dirname(@index_path))
+            File.write(@index_path, json)
+            puts "Classpath index '#{@index_path}': #{items.length} items, #{updated} updated"
+        end
+    end
+
+    def list_classes(path)
+        names = []
+        if File.directory?(path)
+            Dir.glob(File.join(path, '**', '*.class')).each { | item |
+                names.push(IndexClasspath.class_name(item[path.length + 1 .. -1]))
+            }
+        else
+            entries = IndexClasspath.zip_entries(path)
+            if entries.nil?
+                entries = []
+                zi      = detect_zipinfo
+                if zi.nil?
+                    FindInZip.find_with_jar(@java.jar, path, '.class') { | entry | entries.push(entry) }
+                else
+                    FindInZip.find_with_zipinfo(zi, path, '.class') { | entry | entries.push(entry) }
+                end
+            end
+
+            entries.each { | entry |
+                names.push(IndexClasspath.class_name(entry)) if entry.end_with?('.class')
+            }
+        end
+        return names.compact
+    end
+
+    def list_jdk_classes()
+        names = []
+        Artifact.exec(
+            @java.java,
+            '-classpath',
+            "\"#{File.join($lithium_code, 'classes')}\"",
+            'lithium.JavaTools',
+            'classes:') { | stdin, stdout, thread |
+                Artifact.read_exec_output(stdin, stdout, thread) { | line |
+                    mt = /\[.*\s*=>\s*(.*)\]/.match(line)
+                    names.push(mt[1].strip) unless mt.nil?
+                }
+            }
+        return names
+    end
+
+    # convert "a/b/C.class" entry to "a.b.C" class name, inner and synthetic classes are skipped
+    def IndexClasspath.class_name(entry)
+        entry = entry.sub(/\.class$/, '')
+        return nil if entry.include?('$') || entry.end_with?('module-info') || entry.end_with?('package-info')
+        return entry.gsub(/[\/\\]/, '.')
+    end
+
+    # list ZIP entries names reading ZIP central directory, nil is returned for unsupported archives
+    def IndexClasspath.zip_entries(path)
+        File.open(path, 'rb') { | f |
+            size = f.size
+            tail = [ size, 65557 ].min
+            f.seek(size - tail)
+            data = f.read(tail)
+            eocd = data.rindex("PK\x05\x06".b)
+            return nil if eocd.nil? || eocd + 22 > data.length
+
+            cd_size, cd_offset = data[eocd + 12, 8].unpack('VV')
+            return nil if cd_offset == 0xFFFFFFFF || cd_offset + cd_size > size # ZIP64
+
+            f.seek(cd_offset)
+            cd, pos, entries = f.read(cd_size), 0, []
+            while pos + 46 <= cd.length && cd[pos, 4] == "PK\x01\x02".b
+                name_len, extra_len, comment_len = cd[pos + 28, 6].unpack('vvv')
+                entries.push(cd[pos + 46, name_len].force_encoding('UTF-8'))
+                pos = pos + 46 + name_len + extra_len + comment_len
+            end
+            return entries
+        }
+    rescue IOError, SystemCallError
+        return nil
+    end
+
+    def what_it_does() "Index '#{@name}' classpath classes" end
+
+    def self.abbr() 'ICP' end
+end
+
 def SyncWarClasses(art, war_path)
     war_dir  = File.dirname(war_path)
     war_path = File.join($lithium_options['app_server_root'], war_path) if war_dir.nil? || war_dir == '.'
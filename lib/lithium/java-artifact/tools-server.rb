@@ -0,0 +1,135 @@
+require 'json'
+require 'socket'
+require 'digest'
+require 'fileutils'
+
+require 'lithium/core'
+require 'lithium/file-artifact/command'
+require 'lithium/java-artifact/base'
+
+#
+#  Warm "lithium.JavaTools" JVM that serves class methods, classpath search
+#  and checkstyle requests, so loaded classes, listed jars and configured
+#  checkstyle checkers are not lost between requests. A server is started
+#  per classpath, it listens on a loopback port and writes the port and an
+#  access token to:
+#     <home>/.lithium/javatools/<classpath sha1>.json
+#  The server stops itself when it has been idle for the given time.
+#  Protocol: a client sends one JSON line:
+#     { "token": "...", "command": "methods:String", "args": [ "java.lang" ] }
+#  and gets back one JSON line:
+#     { "code": 0, "lines": [ ... ] }
+#
+#  Artifacts call JavaTools via the server if it is running and start a new
+#  JVM otherwise. Usage:
+#     JavaToolsServer:"<home>"          - start the server
+#     JavaToolsServer:"<home>" <idle>   - start the server with the given idle timeout (seconds)
+#     JavaToolsServer:"<home>" stop     - stop the server
+#
+class JavaToolsServer < FileCommand
+    IDLE_TIMEOUT = 1800 # seconds
+
+    def initialize(*args)
+        REQUIRE JAVA
+        super
+        @action ||= $lithium_args[0]
+        @idle   ||= (@action.nil? || @action !~ /^\d+$/) ? IDLE_TIMEOUT : @action.to_i
+    end
+
+    def build()
+        cp = JavaToolsServer.classpath(@java)
+        if @action == 'stop'
+            if JavaToolsServer.request(homedir, cp, 'stop:').nil?
+                puts_warning 'JavaTools server is not running'
+            else
+                puts 'JavaTools server has been stopped'
+            end
+        else
+            state = JavaToolsServer.state(homedir, cp)
+            if state.nil?
+                state = JavaToolsServer.start(@java, homedir, @idle)
+                raise 'JavaTools server cannot be started' if state.nil?
+                puts "JavaTools server has been started on port #{state['port']} (pid = #{state['pid']})"
+            else
+                puts "JavaTools server is running on port #{state['port']} (pid = #{state['pid']})"
+            end
+        end
+    end
+
+    # JavaTools classes, checkstyle and the project classpath
+    def JavaToolsServer.classpath(java)
+        java.classpath().to_s(File.join($lithium_code, 'classes'), JavaToolsServer.checkstyle_jar)
+    end
+
+    def JavaToolsServer.checkstyle_jar()
+        File.join($lithium_code, 'tools', 'java', 'checkstyle', 'checkstyle-8.16-all.jar')
+    end
+
+    def JavaToolsServer.state_path(home, cp)
+        File.join(home, '.lithium', 'javatools', "#{Digest::SHA1.hexdigest(cp)}.json")
+    end
+
+    # Output: running server state or nil
+    def JavaToolsServer.state(home, cp)
+        path = JavaToolsServer.state_path(home, cp)
+        return nil unless File.exist?(path)
+        return JSON.parse(File.read(path))
+    rescue JSON::ParserError, SystemCallError
+        return nil
+    end
+
+    # Send the command to the server running for the given classpath
+    # Output: [ exit code, output lines ] or nil if the server is not running
+    def JavaToolsServer.request(home, cp, command, args = [])
+        state = JavaToolsServer.state(home, cp)
+        return nil if state.nil?
+
+        begin
+            TCPSocket.open('127.0.0.1', state['port']) { | sock |
+                sock.puts(JSON.generate({ 'token' => state['token'], 'command' => command, 'args' => args }))
+                line = sock.gets
+                return nil if line.nil?
+
+                res = JSON.parse(line)
+                lines = res['lines'] || []
+                lines.push(res['error']) unless res['error'].nil?
+                return [ res['code'], lines ]
+            }
+        rescue Errno::ECONNREFUSED
+            # server has been killed without cleaning its state up
+            File.delete(JavaToolsServer.state_path(home, cp)) rescue nil
+            return nil
+        rescue SystemCallError, IOError, JSON::ParserError => e
+            puts_warning "JavaTools server request has failed: #{e}"
+            return nil
+        end
+    end
+
+    # Start detached server and wait until it writes its state
+    # Output: server state or nil if the server has not been started
+    def JavaToolsServer.start(java, home, idle = IDLE_TIMEOUT)
+        cp   = JavaToolsServer.classpath(java)
+        path = JavaToolsServer.state_path(home, cp)
+        FileUtils.mkdir_p(File.dirname(path))
+
+        # project classes are loaded by JavaTools from "lithium.classpath" to re-load them after rebuild
+        pid = Process.spawn(java.java,
+                            '-classpath', [ File.join($lithium_code, 'classes'), JavaToolsServer.checkstyle_jar ].join(File::PATH_SEPARATOR),
+                            "-Dlithium.classpath=#{java.classpath().to_s || ''}",
+                            "-Dlithium.checkstyle.home=#{File.dirname(JavaToolsServer.checkstyle_jar)}",
+                            'lithium.JavaTools', "server:#{path}", idle.to_s,
+                            :in => :close, :out => File::NULL, :err => path.sub(/\.json$/, '.log'), :pgroup => true)
+        Process.detach(pid)
+
+        100.times {
+            state = JavaToolsServer.state(home, cp)
+            return state unless state.nil?
+            sleep(0.1)
+        }
+        return nil
+    end
+
+    def what_it_does() "Run JavaTools server for '#{@name}' classpath" end
+
+    def self.abbr() 'JTS' end
+end
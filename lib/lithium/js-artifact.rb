@@ -5,6 +5,7 @@ require 'lithium/core'
 require 'lithium/file-artifact/command'
 require 'lithium/java-artifact/runner'
 require 'lithium/file-artifact/acquired'
+require 'lithium/file-artifact/check-cache'
 
 
 $NODEJS_MODULES_DIR = 'node_modules'
@@ -287,13 +288,24 @@ end
 
 
 class JavaScriptHint < FileMask
+    include CheckResultCache
+
     def initialize(name)
         REQUIRE JS
         super
     end
 
-    def build
-        raise "Linting of '#{@name}' failed" if Artifact.exec('jshint', fullpath) != 0
+    def check_items(paths, &block)
+        check_exec('jshint', *paths.map { | fp | "\"#{fp}\"" }, &block)
+    end
+
+    # jshint options are looked up in project home
+    def check_config()
+        [ '.jshintrc', '.jshintignore', 'package.json' ].map { | name | File.join(homedir, name) }
+    end
+
+    def check_failed(paths)
+        raise "Linting of '#{@name}' failed"
     end
 
     def what_it_does
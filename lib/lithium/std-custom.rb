@@ -8,7 +8,9 @@ class LithiumStd < Std
         super()
         @log_io, @log_file, @prj_home = nil, nil, prj_home
         unless @prj_home.nil?
-            @log_file = File.join(@prj_home, '.lithium', 'std-out-entities.json')
+            # concurrently running commands get distinct entities files
+            @log_file = $lithium_options['std_entities'] unless $lithium_options.nil?
+            @log_file = File.join(@prj_home, '.lithium', 'std-out-entities.json') if @log_file.nil?
             File.delete(@log_file) if File.exist?(@log_file)
 
             at_exit {